@@ -1,39 +1,92 @@
-
 import os
 from laser_flag import LaserFlag
 from _map_editor import MapEditor
 from lf_functions import game_caption
+from map_format import list_maps
+from settings import Settings
+from save_game import SAVE_EXTENSION, load_game, check_map
+
+
+def list_saves(folder):
+    """the saved matches in the folder, newest first"""
+    if not os.path.isdir(folder):
+        return []
+    saves = [os.path.join(folder, filename) for filename in os.listdir(folder)
+             if filename.endswith(SAVE_EXTENSION)]
+    return sorted(saves, key=os.path.getmtime, reverse=True)
+
 
-map_list = os.listdir('maps')
-while True:
-    os.system('cls')
-    print("*"*60)
-    print(game_caption())
-    print("*"*60)
-    print()
-    print("Choose a map; (E) to open the Map Editor; or (Q) to quit:\n")
-
-    i = 0
-    for map_file in map_list:
-        print(f'{i}) ', map_file)
-        i += 1
-
-    print()
-    user_input = input()
-    if user_input.upper() == 'Q':
-        break
-
-    elif user_input.upper() == 'E':
-        mapeditor = MapEditor()
-        mapeditor.run()
-
-    try:
+def ask_ai_teams():
+    """which team, if any, the computer plays"""
+    print("\nComputer plays team (1) or (2); or Enter for two players:")
+    ai_input = input().strip()
+    return [ai_input] if ai_input in ('1', '2') else []
+
+
+# the computer players run in worker processes, which import this file
+#   again on some systems; only the main process shows the menu
+if __name__ == '__main__':
+
+    # one file per map; .lfm files are preferred over JSON ones
+    map_list = list_maps('maps')
+    while True:
         os.system('cls')
-        print('close this console window to end the game')
-        user_input = int(user_input)
-        filename = f'maps/{map_list[user_input]}'
-        lf = LaserFlag(filename)
-        lf.run_game()
-
-    except:
-        continue
\ No newline at end of file
+        print("*"*60)
+        print(game_caption())
+        print("*"*60)
+        print()
+        print("Choose a map; (E) to open the Map Editor; (R) to resume a "
+              "saved game; or (Q) to quit:\n")
+
+        i = 0
+        for map_file in map_list:
+            print(f'{i}) ', os.path.basename(map_file))
+            i += 1
+
+        print()
+        user_input = input()
+        if user_input.upper() == 'Q':
+            break
+
+        elif user_input.upper() == 'E':
+            mapeditor = MapEditor()
+            mapeditor.run()
+
+        elif user_input.upper() == 'R':
+            save_list = list_saves(Settings().save_folder)
+            print()
+            for i, save_file in enumerate(save_list):
+                print(f'{i}) ', os.path.basename(save_file))
+            try:
+                save_file = save_list[int(input())]
+            except (ValueError, IndexError):
+                continue
+            # turn a save down before the game window opens, and leave the
+            #   reason up until the menu is shown again
+            try:
+                saved = load_game(save_file)
+                check_map(saved)
+            except (ValueError, OSError) as error:
+                print(error)
+                input('press Enter to return to the menu')
+                continue
+            ai_teams = ask_ai_teams()
+
+            os.system('cls')
+            print('close this console window to end the game')
+            lf = LaserFlag(saved['map'], ai_teams, saved=saved)
+            lf.run_game()
+
+        try:
+            user_input = int(user_input)
+            filename = map_list[user_input]
+
+            ai_teams = ask_ai_teams()
+
+            os.system('cls')
+            print('close this console window to end the game')
+            lf = LaserFlag(filename, ai_teams)
+            lf.run_game()
+
+        except:
+            continue
@@ -1,6 +1,5 @@
 import os
 import sys
-import json
 
 import pygame
 
@@ -13,6 +12,9 @@ from button import Button
 from units import BasicUnit, Sniper, Grunt, Scout
 
 from lf_functions import game_caption
+from los_cache import save_los_table
+from map_format import (write_lfm, write_json, BINARY_EXTENSION,
+    JSON_EXTENSION)
 
 from color_picker import ColorPicker
 
@@ -220,20 +222,25 @@ class MapEditor:
 
     def run(self):
         while True:
-            self._check_events()
-            if self.slider_picked != None:
-                mouse_pos = pygame.mouse.get_pos()
-                y_value = mouse_pos[1]
-                self.slider_picked.set_circle_position(y_value)
-                self._update_screen()
+            # sleep until something happens, then handle everything queued
+            events = [pygame.event.wait()]
+            events += pygame.event.get()
+            self._check_events(events)
 
 
-    def _check_events(self):
+    def _check_events(self, events):
         """respond to keypresses & mouse events"""
-        for event in pygame.event.get():
+        slider_moved = False
+        for event in events:
             # if click on window X
             if event.type == pygame.QUIT:
                 self._quit()
+            # drag the picked slider along with the mouse
+            elif event.type == pygame.MOUSEMOTION:
+                if self.slider_picked != None:
+                    y_value = event.pos[1]
+                    self.slider_picked.set_circle_position(y_value)
+                    slider_moved = True
             # respond to other mouse clicks
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 mouse_pos = pygame.mouse.get_pos()
@@ -250,6 +257,11 @@ class MapEditor:
                     self.slider_picked = None
                     self._update_team_colors()
                     self._update_screen()
+                    slider_moved = False
+
+        # redraw once for however many motion events came in
+        if slider_moved:
+            self._update_screen()
 
 
     def _check_button_clicks(self, mouse_pos):
@@ -362,18 +374,18 @@ class MapEditor:
     def _edit_terrain(self, tile):
         """loop through the three terrain types"""
         if tile.type == 'level':
-            tile.change_type('elevated')
+            new_type = 'elevated'
         elif tile.type == 'elevated':
             if tile.occupied:
-                tile.change_type('base_u')
+                new_type = 'base_u'
             else:
-                tile.change_type('wall')
+                new_type = 'wall'
         elif tile.type == 'wall':
-            tile.change_type('base_u')
+            new_type = 'base_u'
         elif 'base' in tile.type:
-            tile.change_type('level')
-        self.game_map.determine_adjoiners()
-        self.game_map.determine_wallcaps()
+            new_type = 'level'
+        # updates the wall caps and the LOS table around the tile
+        self.game_map.change_terrain(tile, new_type)
 
 
     def _edit_base(self, tile):
@@ -474,6 +486,9 @@ class MapEditor:
                                        self.settings.b_w_team_color['2'],
                                        self.settings.alt_team_color['2'])
 
+        # the bases are drawn in team colors, so redraw the whole map layer
+        self.game_map.render_map()
+
 
 
     def _change_team_name(self, team):    # '1' or '2'
@@ -532,19 +547,28 @@ class MapEditor:
                     'tiles': tile_list,
                     'units': unit_list}
 
-        map_json = json.dumps(map_dict, indent=4)
-
-
+        # the binary format loads faster; JSON can still be chosen
         filename = tkinter.filedialog.asksaveasfilename(
-            defaultextension='.txt', title='Save map file', initialdir='maps')
+            defaultextension=BINARY_EXTENSION, title='Save map file',
+            initialdir='maps',
+            filetypes=[('Laser Flag map', f'*{BINARY_EXTENSION}'),
+                       ('JSON map', f'*{JSON_EXTENSION}')])
 
         if filename != '':
 
-            if filename[-4:] != '.txt':
-                filename += '.txt'
+            if filename.endswith(JSON_EXTENSION):
+                write_json(map_dict, filename)
+                # the launcher loads the .lfm file if there's one as well
+                lfm_filename = filename[:-len(JSON_EXTENSION)] + BINARY_EXTENSION
+                if os.path.exists(lfm_filename):
+                    print(f'note: {lfm_filename} will still be loaded instead')
+            else:
+                if not filename.endswith(BINARY_EXTENSION):
+                    filename += BINARY_EXTENSION
+                write_lfm(map_dict, filename)
 
-            with open(f'{filename}', 'w') as f:
-                f.write(map_json)
+            # save the edited LOS table too, so the map loads quickly
+            save_los_table(self.game_map)
 
             self.filename = filename
             self.map_name = os.path.split(self.filename)[1]
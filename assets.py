@@ -0,0 +1,78 @@
+# assets.py
+
+"""a process-wide registry of images and fonts, so each file is only read
+from disk and converted to the display format once, however many sprites use
+it; rendered lines of text are kept too, since most labels repeat"""
+
+from functools import lru_cache
+
+import pygame
+
+# shared Surfaces, keyed by (tileset, name, rotation)
+_images = {}
+
+# shared Fonts, keyed by (face, size); SysFont searches the system fonts
+_fonts = {}
+
+# how many rendered lines of text to keep around
+TEXT_CACHE_SIZE = 512
+
+
+def load_image(name, tileset = None):
+    """return the shared Surface for images/<name>.png, or for
+    images/tilesets/<tileset>/<name>.png if a tileset is given
+
+    every caller gets the same Surface, so never draw onto it"""
+    key = (tileset, name, 0)
+    image = _images.get(key)
+    if image is None:
+        if tileset:
+            image = pygame.image.load(f'images/tilesets/{tileset}/{name}.png')
+        else:
+            image = pygame.image.load(f'images/{name}.png')
+        image = _convert(image)
+        _images[key] = image
+    return image
+
+
+def rotated_image(name, tileset, angle):
+    """the shared Surface for an image turned counterclockwise by angle"""
+    key = (tileset, name, angle)
+    image = _images.get(key)
+    if image is None:
+        image = pygame.transform.rotate(load_image(name, tileset), angle)
+        _images[key] = image
+    return image
+
+
+def _convert(image):
+    """match the display's pixel format so blits don't convert every time;
+    that needs a display, so anything loaded before one exists is kept as is"""
+    if not pygame.display.get_surface():
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image.convert_alpha()
+    return image.convert()
+
+
+
+def load_font(face, size):
+    """return the shared Font for a system font face at a given size"""
+    key = (face, size)
+    font = _fonts.get(key)
+    if font is None:
+        font = pygame.font.SysFont(face, size)
+        _fonts[key] = font
+    return font
+
+
+def render_line(face, size, text, color):
+    """the shared Surface for one line of antialiased text; like the images,
+    never draw onto it"""
+    return _render_line(face, size, text, tuple(pygame.Color(color)))
+
+
+@lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _render_line(face, size, text, color):
+    """render_line, once the color is hashable"""
+    return load_font(face, size).render(text, True, color)
@@ -51,8 +51,12 @@ class Button:
         self.color_rect.y = self.tile_size*grid_position[1] + border_weight
 
         # put the button in an unselected state
+        self.mtext_key = None
         self.unselect()
 
+        # what the button looked like the last time it was drawn
+        self.drawn_state = None
+
         if alt_image:
             self.alt_image = alt_image
             self.alt_image_rect = self.alt_image.get_rect()
@@ -89,13 +93,23 @@ class Button:
 
 
     def _create_mtext(self, text_color):
-        """turn msg into a rendered image and center text on the button"""
+        """turn msg into a rendered image and center text on the button;
+        nothing to do if the message and color haven't changed"""
+        if self.mtext_key == (self.msg, text_color):
+            return
+        self.mtext_key = (self.msg, text_color)
         self.mtext = MText(self, self.msg, self.font_size, text_color, self.justify, self.line_space)
 
 
 
     def draw_button(self):
-        """draw blank button and then draw message"""
+        """draw blank button and then draw message; returns the rect that
+        needs updating on the display if the button has changed, else None"""
+        state = (self.visible, self.selected, self.msg,
+                 self.button_color, self.text_color, self.border_color)
+        changed = state != self.drawn_state
+        self.drawn_state = state
+
         if self.visible:
             if not self.selected:
                 self.screen.fill(self.border_color, self.rect)
@@ -109,4 +123,9 @@ class Button:
             self.mtext.blitme(self.rect.x + x_add, self.rect.y + y_add)
 
         elif self.alt_image:
-            self.screen.blit(self.alt_image, self.alt_image_rect)
\ No newline at end of file
+            self.screen.blit(self.alt_image, self.alt_image_rect)
+
+        if changed:
+            if self.alt_image:
+                return self.rect.union(self.alt_image_rect)
+            return self.rect
\ No newline at end of file
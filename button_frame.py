@@ -4,6 +4,7 @@ import pygame
 import pygame.font
 
 from button import Button
+from assets import load_image
 
 class ButtonFrame():
     """a frame to hold buttons to control the game"""
@@ -40,7 +41,7 @@ class ButtonFrame():
             border_weight = 2,
             grid_position=(25, 1.5), # need to add (22, 0.5) to convert to NewButton
             width=3,
-            alt_image=pygame.image.load('images/the_ever_seeing_eye.png'))
+            alt_image=load_image('the_ever_seeing_eye'))
 
         lf_game.score_label[self.teams[0]] = Button(lf_game, msg='',
             color=self.settings.team_color[self.teams[0]],
@@ -67,7 +68,7 @@ class ButtonFrame():
             border_weight = 2,
             grid_position=(25, 19.5),
             width=3,
-            alt_image=pygame.image.load('images/the_ever_seeing_eye.png'),
+            alt_image=load_image('the_ever_seeing_eye'),
             visible=False)
 
         lf_game.score_label[self.teams[1]] = Button(lf_game, msg='',
@@ -1,5 +1,7 @@
 import pygame
 
+from assets import load_font
+
 
 class ColorPicker:
     """sliders for red green and blue to choose a custom color"""
@@ -18,7 +20,7 @@ class ColorPicker:
         self.rect.y = grid_position[1] * self.tile_size
 
         self.font_size  = int(self.tile_size / 1.5)
-        self.font       = pygame.font.SysFont(self.settings.font, self.font_size)
+        self.font       = load_font(self.settings.font, self.font_size)
         self.label      = self.font.render(label, True, 'black')
         self.label_rect = self.label.get_rect()
         self.label_rect.x = self.rect.x + (self.width-self.label_rect.width)//2
@@ -1,102 +1,111 @@
 # game_map.py
 
-import json
+import random
 
 import pygame
 
 from tile import Tile
 from units import BasicUnit, Sniper, Grunt, Scout
-from lf_functions import CARDINALS, determine_range, determine_los
+from lf_functions import CARDINALS
+from game_state import MapState, EDGE_TILE
 
-class GameMap:
-    """a class to store map data and build the map"""
+class GameMap(MapState):
+    """a class to store map data and build the map; the rules side of it is
+    in MapState, this adds the tile images and drawing"""
+
+    # build tiles and units that can draw themselves
+    tile_class   = Tile
+    unit_classes = {'basic':  BasicUnit,
+                    'sniper': Sniper,
+                    'scout':  Scout,
+                    'grunt':  Grunt}
 
     def __init__(self, lf_game, filename):
         """initialize the map from a file"""
-        self.lf_game  = lf_game
         self.screen   = lf_game.screen
-        self.settings = lf_game.settings
-
-        self.filename        = filename
 
-        self.tilefolder = f'images/tilesets/{self.settings.tileset}'
+        self.tilefolder = f'images/tilesets/{lf_game.settings.tileset}'
 
-        # initialize tracking variables
-        self.tiles           = []
-        self.walls           = []
-        self.start_positions = []
-        self.bases           = {self.settings.teams[0]: [],
-                                self.settings.teams[1]: []}
+        # tiles whose look has changed since the map layer was last drawn
+        self.dirty_tiles     = set()
 
-        # initialize the map
-        self._read_map()
+        # the floor tiles' rotations come from the match's seed, if it has
+        #   one (the editor's maps don't)
+        self.tile_rng = random.Random(getattr(lf_game, 'seed', None))
 
-        # build the all_walls list for simpler looping
-        self.all_walls = []
-        for row in self.walls:
-            for wall in row:
-                self.all_walls.append(wall)
+        # read the map, find adjoiners and load the line-of-sight table
+        super().__init__(lf_game, filename)
 
-        # build the all_tiles list for simpler looping
-        self.all_tiles = []
-        for row in self.tiles:
-            for tile in row:
-                self.all_tiles.append(tile)
-
-        # then determine adjoiners & wall caps
-        self.determine_adjoiners()
+        # then determine wall caps
         self.determine_wallcaps()
 
+        # pre-render the whole map once; after this draw_map only redraws
+        #   the tiles that changed
+        self.render_map()
+
 ################################################################################
 # PUBLIC METHODS
 ################################################################################
 
-    def draw_map(self):
-        """redraw the map tiles"""
-        for row in self.tiles:
-            for tile in row:
-                tile.blitme()
-
-
-
-    def determine_adjoiners(self):
-        """determine what's occupying the 8 tiles adjacent to each tile"""
-        m = self.settings.grid_size-1
-        for r, row in enumerate(self.tiles):
-            for c, tile in enumerate(row):
-                if r > 0:
-                    tile.adjoiners['n'] = self.tiles[r-1][c]
-                if r < m:
-                    tile.adjoiners['s'] = self.tiles[r+1][c]
-                if c > 0:
-                    tile.adjoiners['w'] = self.tiles[r][c-1]
-                if c < m:
-                    tile.adjoiners['e'] = self.tiles[r][c+1]
-                if r > 0 and c > 0:
-                    tile.adjoiners['nw'] = self.tiles[r-1][c-1]
-                if r > 0 and c < m:
-                    tile.adjoiners['ne'] = self.tiles[r-1][c+1]
-                if r < m and c < m:
-                    tile.adjoiners['se'] = self.tiles[r+1][c+1]
-                if r < m and c > 0:
-                    tile.adjoiners['sw'] = self.tiles[r+1][c-1]
-
-
-
-    def determine_wallcaps(self):
-        """determines which wallcap images should be shown"""
+    def render_map(self):
+        """draw every tile onto the map layer, a surface the size of the map
+        that draw_map copies to the screen in one blit; call this again if
+        something changes the look of the whole map, e.g. the team colors"""
+        tile_size = self.settings.tile_size
+        width     = max(len(row) for row in self.tiles) * tile_size
+        height    = len(self.tiles) * tile_size
+        self.map_rect  = pygame.Rect(tile_size // 2, tile_size // 2,
+                                     width, height)
+        self.map_layer = pygame.Surface(self.map_rect.size)
         for tile in self.all_tiles:
+            self._render_tile(tile)
+        self.dirty_tiles.clear()
+
+
+
+    def draw_map(self):
+        """redraw the changed tiles on the map layer, then draw it; returns
+        the screen rects of the tiles that changed"""
+        changed = []
+        for tile in self.dirty_tiles:
+            self._render_tile(tile)
+            changed.append(tile.rect)
+        self.dirty_tiles.clear()
+        self.screen.blit(self.map_layer, self.map_rect)
+        return changed
+
 
-            # first unflag any existing wallcaps
-            for c in CARDINALS:
-                tile.show_wallcaps[c] = False
+
+    def determine_wallcaps(self, tiles = None):
+        """determines which wallcap images should be shown, on all the
+        tiles or just the ones given"""
+        if tiles is None:
+            tiles = self.all_tiles
+        for tile in tiles:
 
             # if the tile is a wall, check the 4 adjoiners
+            show_wallcaps = {c: False for c in CARDINALS}
             if tile.type == 'wall':
-                for c in CARDINALS:
-                    if tile.adjoiners[c].type != 'wall':
-                        tile.show_wallcaps[c] = True
+                adjoiners = self.adjoiner_tiles[tile.index]
+                for i, c in enumerate(CARDINALS):
+                    if adjoiners[i].type != 'wall':
+                        show_wallcaps[c] = True
+
+            # only redraw the tile if its wallcaps actually changed
+            if show_wallcaps != tile.show_wallcaps:
+                tile.show_wallcaps = show_wallcaps
+                self.dirty_tiles.add(tile)
+
+
+
 
+    def change_terrain(self, tile, new_type):
+        """change a tile's terrain; only it and the tiles beside it can
+        need different wall caps"""
+        super().change_terrain(tile, new_type)
+        beside = self.adjoiner_tiles[tile.index][:len(CARDINALS)]
+        self.determine_wallcaps(
+            [tile] + [other for other in beside if other is not EDGE_TILE])
 
 
 
@@ -145,46 +154,11 @@ class GameMap:
 
     def build_teams(self, lf_game):
         """place the units on the map"""
-        tile_size = self.settings.tile_size
-
-        for start_position in self.start_positions:
-            if start_position['class'] == 'basic':
-                unit = BasicUnit(self, team = start_position['team'])
-            elif start_position['class'] == 'sniper':
-                unit = Sniper(self, team = start_position['team'])
-            elif start_position['class'] == 'grunt':
-                unit = Grunt(self, team = start_position['team'])
-            elif start_position['class'] == 'scout':
-                unit = Scout(self, team = start_position['team'])
-
-            # assign the tile to the unit
-            row = start_position['row']
-            col = start_position['col']
-            unit.tile = self.tiles[row][col]
-
-            # place the unit on the tile
-            unit.rect.x = (col + 0.5) * tile_size
-            unit.rect.y = (row + 0.5) * tile_size
-            unit.tile.occupied = unit
-
-            # figure out what tiles the unit can reach and see
-            determine_range(self, unit)
-            determine_los(self, unit)
-
-            # determine if the unit is in cover
-            unit.check_cover()
+        super().build_teams(lf_game)
 
-            if unit.tile.type == 'elevated':
-                unit.elevated = True
-
-            # add unit to the proper team and the master list
-            team = unit.team
-            lf_game.teams[team].add(unit)
-            lf_game.all_units.append(unit)
-
-            # team 2 begins the game on overwatch
-            if unit.team == self.settings.teams[1]:
-                unit.current_ap = -unit.max_overwatch
+        # place each unit's sprite on its tile
+        for unit in lf_game.all_units:
+            unit.rect.topleft = unit.tile.rect.topleft
 
 
 
@@ -194,11 +168,8 @@ class GameMap:
 
     def eliminate_unit(self, unit):
         """delete the unit IF there are no friendly bases on the map"""
-
-        if len(self.bases[unit.team]) == 0:
-            print(f'{unit.unit_class} eliminated! Team has no recharging base')
+        if super().eliminate_unit(unit):
             unit.kill()
-            unit.tile.occupied = False
             self.clear_highlights_and_marks()
 
 
@@ -206,117 +177,8 @@ class GameMap:
 # PROTECTED METHODS USED BY __init__()
 ################################################################################
 
-    def _read_map(self):
-        """loads a map in the new JSON format"""
-        with open(self.filename, 'r') as f:
-            map_json = json.load(f)
-
-        # try to load team colors & score limits; otherwise just keep defaults
-        try:
-            self.settings.team_names     = map_json['team_names']
-            self.settings.team_color     = map_json['team_color']
-            self.settings.alt_team_color = map_json['alt_team_color']
-            self.settings.b_w_team_color = map_json['b_w_team_color']
-            self.settings.score_limit    = map_json['score_limit']
-        except:
-            pass
-
-        tile_ID = 0
-        row_of_tiles = []
-        for r, row in enumerate(map_json['tiles']):
-            row_of_tiles = []
-            row_of_walls = []
-
-            for c, tile in enumerate(row):
-                tile_ID += 1
-                tile_data = {'row':  r, 'col': c,
-                             'type': tile, 'ID': tile_ID, 'occupied': False}
-                # create the tile and add it to the row
-                new_tile = Tile(self, tile_data)
-                row_of_tiles.append(new_tile)
-
-                # if it's a wall add it to that list
-                if 'wall' in new_tile.type:
-                    row_of_walls.append(new_tile)
-
-                # if it's a base add it to that list
-                elif 'base' in new_tile.type:
-                    if '_u' in new_tile.type:
-                        self.bases[self.settings.teams[0]].append(new_tile)
-                        self.bases[self.settings.teams[1]].append(new_tile)
-                    elif f'_{self.settings.teams[0]}' in new_tile.type:
-                        self.bases[self.settings.teams[0]].append(new_tile)
-                    elif f'_{self.settings.teams[1]}' in new_tile.type:
-                        self.bases[self.settings.teams[1]].append(new_tile)
-
-            # add the rows to the master lists
-            self.tiles.append(row_of_tiles)
-            self.walls.append(row_of_walls)
-
-        for unit in map_json['units']:
-            start_position = {'row': unit[2], 'col': unit[3],
-                        'team': unit[0], 'class': unit[1]}
-            self.start_positions.append(start_position)
-
-
-
-
-
-
-    # def _superseded_read_map(self):
-    #     """Loads a map in ASCII format"""
-    #     f = open(self.filename, 'r')
-    #     tile_ID = 0
-    #     for r, row in enumerate(f.readlines()):
-    #         row_list = row.split()
-    #         row_of_tiles = []
-    #         row_of_walls = []
-    #         for c, code in enumerate(row_list):
-    #             tile_ID += 1
-
-    #             # initialize tile data
-    #             tile_data = {'row': r, 'col': c, 'occupied': False,
-    #                 'type': self.settings.tile_dict[code], 'ID': tile_ID}
-
-    #             if 'unit' in tile_data['type']:
-    #                 unit_data = tile_data['type'].split('_')
-    #                 unit_team = unit_data[1]
-    #                 unit_class = unit_data[2]
-    #                 start_position = {'row': r, 'col': c,
-    #                     'team': unit_team, 'class': unit_class}
-    #                 self.start_positions.append(start_position)
-    #                 tile_data['type'] = 'level'
-
-    #             # create the tile and add it to the row
-    #             new_tile = Tile(self, tile_data)
-    #             row_of_tiles.append(new_tile)
-
-    #             # if it's a wall add it to that list
-    #             if 'wall' in new_tile.type:
-    #                 row_of_walls.append(new_tile)
-
-    #             # if it's a base add it to that list
-    #             elif 'base' in new_tile.type:
-    #                 if '_u' in new_tile.type:
-    #                     self.bases[self.settings.teams[0]].append(new_tile)
-    #                     self.bases[self.settings.teams[1]].append(new_tile)
-    #                 elif f'_{self.settings.teams[0]}' in new_tile.type:
-    #                     self.bases[self.settings.teams[0]].append(new_tile)
-    #                 elif f'_{self.settings.teams[1]}' in new_tile.type:
-    #                     self.bases[self.settings.teams[1]].append(new_tile)
-
-
-
-
-    #         # add the rows to the master lists
-    #         self.tiles.append(row_of_tiles)
-    #         self.walls.append(row_of_walls)
-    #     f.close()
-
-    #     print(f"loaded map {self.filename}")
-    #     print(f"team 1 bases: {self.bases[self.settings.teams[0]]}")
-    #     print(f"team 2 bases: {self.bases[self.settings.teams[1]]}")
-
-
-
-
+    def _render_tile(self, tile):
+        """draw one tile, terrain first, onto its spot on the map layer"""
+        rect = tile.rect.move(-self.map_rect.x, -self.map_rect.y)
+        tile.draw_terrain(self.map_layer, rect)
+        tile.draw_overlays(self.map_layer, rect)
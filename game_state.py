@@ -0,0 +1,1062 @@
+# game_state.py
+
+"""the rules of Laser Flag with no pygame in them: the map, its tiles, the
+units and the match, plus the functions that play a match out. The pygame
+classes (GameMap, Tile, BasicUnit and its subclasses, and LaserFlag) are
+built on top of these and only add the drawing, so matches can also be
+simulated without a display"""
+
+import random
+from io import StringIO
+from contextlib import redirect_stdout
+
+from settings import Settings
+from lf_functions import (Point, roll_dice, CARDINALS, ADJOINER_DIRECTIONS, swap,
+    tile_direction, determine_range, determine_reach, determine_los)
+from los_cache import load_los_table, map_key
+from map_format import load_map
+
+
+################################################################################
+# TILES
+################################################################################
+
+class EdgeTile:
+    """stands in for whatever is past the edge of the map; the game_map puts
+    the one EDGE_TILE in game_map.adjoiner_tiles wherever a tile has no
+    neighbor, and it never changes"""
+    __slots__ = ()
+    type      = 'edge'
+    row       = None
+    col       = None
+    occupied  = None
+
+EDGE_TILE = EdgeTile()
+
+
+
+class TileState:
+    """one map tile: its terrain, where it is, and who's standing on it"""
+
+    def __init__(self, game_map, tile_data):
+        """create one map tile"""
+        super().__init__()
+
+        # get dictionary data obtained by _read_map
+        self.type = tile_data['type']
+
+        self.game_map = game_map
+        self.settings = game_map.settings
+
+        self.ID = tile_data['ID']
+        # position in game_map.all_tiles; IDs start counting at 1
+        self.index = self.ID - 1
+
+        self.row      = tile_data['row']
+        self.col      = tile_data['col']
+        self.occupied = tile_data['occupied']
+
+        # top left corner on the screen; the map starts half a tile in
+        tile_size = self.settings.tile_size
+        half_tile = tile_size // 2
+        self.x    = round(self.col * tile_size) + half_tile
+        self.y    = round(self.row * tile_size) + half_tile
+
+        # corner coordinates
+        self.NW  = Point(self.x,             self.y)
+        self.N   = Point(self.x + half_tile, self.y)
+        self.NE  = Point(self.x + tile_size, self.y)
+        self.W   = Point(self.x,             self.y + half_tile)
+        self.CEN = Point(self.x + half_tile, self.y + half_tile)
+        self.E   = Point(self.x + tile_size, self.y + half_tile)
+        self.SW  = Point(self.x,             self.y + tile_size)
+        self.S   = Point(self.x + half_tile, self.y + tile_size)
+        self.SE  = Point(self.x + tile_size, self.y + tile_size)
+
+
+    @property
+    def adjoiners(self):
+        """dictionary of the 8 adjoining tiles by direction; the game_map
+        keeps them all in one list, so this is just for convenience"""
+        return dict(zip(ADJOINER_DIRECTIONS,
+                        self.game_map.adjoiner_tiles[self.index]))
+
+
+    def change_type(self, new_type):
+        """for use by the Map Editor"""
+        self.type = new_type
+
+
+################################################################################
+# UNITS
+################################################################################
+
+class UnitState:
+    """The rules for player units. SniperState, ScoutState, and GruntState
+    are subclasses"""
+
+    unit_class = 'basic'
+
+    def __init__(self, game_map, team):
+        super().__init__()
+        self.game_map = game_map
+        self.settings = game_map.settings
+
+        self.team = team
+
+        # load default settings
+        self.max_ap              = self.settings.base_max_ap
+        self.move_speed          = self.settings.base_move_speed
+        self.to_hit              = self.settings.base_to_hit
+        self.elevated_hit_bonus  = self.settings.base_elevated_hit_bonus
+        self.cover_defense_bonus = self.settings.base_cover_defense_bonus
+        self.elev_defense_malus  = self.settings.base_elev_defense_malus
+        self.overwatch_penalty   = self.settings.base_overwatch_penalty
+        self.max_overwatch       = self.settings.base_max_overwatch
+        # only Scout subclasses can climb onto cover and keep moving
+        self.can_climb = self.settings.base_can_climb
+
+        # the tile the unit is standing on
+        self.tile = None
+
+        # store walking range tiles and line-of-sight tiles
+        self.reachable_tiles = None
+        self.tile_steps      = None
+        self.tile_distance   = None
+        # multi-AP reachability; filled in by find_reach()
+        self.reach_cost      = None
+        self.reach_parent    = None
+        self.visible_tiles   = None
+        # selection flags
+        self.selected        = False
+        self.visible         = False
+        self.targeted        = False
+        # in-game status flags
+        self.can_move        = True
+        self.laser_charged        = True
+        self.current_ap      = self.max_ap
+        self.laser_uncharged = False
+        self.laser_charging  = False
+        self.elevated        = False
+
+        # fill in_cover dictionary
+        self.in_cover = {}
+        for direction in CARDINALS:
+            self.in_cover[direction] = False
+
+
+    def check_cover(self):
+        """determine which directions the unit is covered in"""
+        # the cardinals come first in the game_map's list of adjoiners
+        adjoiners = self.game_map.adjoiner_tiles[self.tile.index]
+        # if elevated, only check for walls
+        if self.tile.type == 'elevated':
+            for i, direction in enumerate(CARDINALS):
+                if adjoiners[i].type == 'wall':
+                    self.in_cover[direction] = True
+                else: self.in_cover[direction] = False
+        # if on level ground, check for walls and elevated tiles
+        else:
+            for i, direction in enumerate(CARDINALS):
+                if (adjoiners[i].type == 'wall' or
+                    adjoiners[i].type == 'elevated'
+                ):
+                    self.in_cover[direction] = True
+                else: self.in_cover[direction] = False
+
+
+    def is_in_cover(self, attacking_unit):
+        """return True if unit is in cover against enemy unit"""
+        # tile_direction returns a string with one or two letters
+        found_cover = False
+        enemy_direction = tile_direction(
+            self.tile, attacking_unit.tile)
+        for direction in enemy_direction[:]:
+            if self.in_cover[direction]:
+                found_cover = True
+        return found_cover
+
+
+    def move(self, game_map, tile):
+        """Move the selected unit to the selected tile"""
+        if not self.can_move: return
+        if tile == self.tile: return
+        # unflag the old tile, assign the new tile to the unit, flag the new tile
+        tracker = game_map.lf_game.tracker
+        self.tile.occupied = None
+        tracker.tile_vacated(self.tile)
+        self.tile          = tile
+        self.tile.occupied = self
+        tracker.tile_taken(self.tile)
+        # determine which directions the unit is covered in
+        self.check_cover()
+        # flag whether the unit is on elevated terrain
+        if self.tile.type == 'elevated':
+            self.elevated = True
+        else:
+            self.elevated = False
+        # test if the unit has touched base:
+        self._check_for_base()
+        # determine new walking range and line-of-sight
+        determine_range(game_map, self)
+        determine_los(game_map, self)
+        # charge one action point
+        self.current_ap -= 1
+        if self.current_ap == 0:
+            self.can_move = False
+        self.reach_cost = None
+
+
+    def find_reach(self):
+        """work out the fewest AP needed to reach every tile this turn, and
+        the route there; call again if other units have moved since"""
+        determine_reach(self.game_map, self)
+
+
+    def ap_cost(self, tile):
+        """AP needed to end up on the tile this turn, or None if the unit
+        can't get there"""
+        if self.reach_cost is None:
+            self.find_reach()
+        return self.reach_cost.get(tile)
+
+
+    def path_to(self, tile):
+        """list the tiles to move() to, one per AP, to end up on the tile
+        this turn; empty if already there, None if it can't get there"""
+        if self.ap_cost(tile) is None:
+            return None
+        path = []
+        while tile != self.tile:
+            path.append(tile)
+            tile = self.reach_parent[tile]
+        path.reverse()
+        return path
+
+
+    def end_turn(self):
+        """actions at the end of the unit's team's turn"""
+        self.finish_charging()
+        self.selected = False
+        if self.current_ap > self.max_overwatch:
+            self.current_ap = self.max_overwatch
+        if self.laser_uncharged or not self.can_move:
+            self.current_ap = 0
+        self.current_ap = -self.current_ap
+        self.reach_cost = None
+
+
+    def begin_turn(self):
+        """actions at the beginning of the unit's team's turn"""
+        self.finish_charging()
+        self.selected   = False
+        self.current_ap = self.max_ap
+        self.can_move   = True
+        self.reach_cost = None
+
+
+
+    def _check_for_base(self):
+        """check if the unit is on a friendly base"""
+        if ((self.tile.type  == 'base_u' or
+             self.tile.type  == f'base_{self.team}') and
+            self.laser_uncharged):
+            self.begin_charging()
+
+
+    def hit(self):
+        """when the unit is hit by an enemy laser"""
+        self.targeted        = False
+        # if unit was on overwatch, remove his APs
+        if self.current_ap < 0:
+            self.current_ap  = 0
+        # units can be hit again while their laser is down
+        if not self.laser_uncharged:
+            self.game_map.lf_game.tracker.laser_lost(self)
+        self.laser_charged        = False
+        self.laser_uncharged = True
+        self.laser_charging  = False
+        self.game_map.eliminate_unit(self)
+        self._check_for_base()
+
+    def begin_charging(self):
+        """when a deactivated unit touches his own base"""
+        if self.laser_uncharged:
+            self.game_map.lf_game.tracker.laser_regained(self)
+        self.laser_uncharged = False
+        self.laser_charging  = True
+        self.laser_charged        = False
+
+    def finish_charging(self):
+        """after the recharged unit's turn has ended, recharge its laser"""
+        if not self.laser_uncharged:
+            self.laser_charging = False
+            self.laser_charged  = True
+
+
+    def fire(self, overwatch = False):
+        """some classes override this function;
+            make sure any changes here are copied if necessary"""
+        self.selected   = False
+        self.can_move   = False
+        self.reach_cost = None
+        # overwatch shots do not require recharging
+        if overwatch:
+            self.current_ap += 1
+        # regular shots
+        else:
+            self.laser_charged   = False
+            self.current_ap = 0
+
+################################
+
+class SniperState(UnitState):
+    """A sniper has higher accuracy and lower mobility; it may fire twice
+        roll to hit : 6
+        tiles per AP: 4
+        EXTRA: can fire multiple times
+                - only loses 1 AP on firing (base class loses all)
+                - but can_move remains False until next turn"""
+
+    unit_class = 'sniper'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.to_hit      += self.settings.sniper_to_hit
+        self.move_speed  += self.settings.sniper_move_speed
+
+
+    def fire(self, overwatch = False):
+        """Snipers must stop moving but can continue firing in place"""
+        self.selected   = False
+        self.can_move   = False
+        self.reach_cost = None
+        # overwatch shots do not require recharging
+        if overwatch:
+            self.current_ap += 1
+        # regular shots
+        else:
+            self.laser_charged   = True
+            self.current_ap -=1
+
+################################
+
+class ScoutState(UnitState):
+    """A scout has higher mobility and lower accuracy; it can move after firing
+        roll to hit : 8
+        tiles per AP: 6
+        EXTRA: can climb cover tiles with no penalty"""
+
+    unit_class = 'scout'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.can_climb   = self.settings.scout_can_climb
+        self.to_hit     += self.settings.scout_to_hit
+        self.move_speed += self.settings.scout_move_speed
+
+################################
+
+class GruntState(UnitState):
+    """A grunt has average mobility and accuracy; it loves cover and low ground
+        roll to hit : 7
+        tiles per AP: 5
+        EXTRA: Grunts get more extreme tactical advantages and disadvantages.
+            If a normal unit gets 2, a Grunt gets 3; whether good or bad"""
+
+    unit_class = 'grunt'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cover_defense_bonus += self.settings.grunt_cover_defense_bonus
+        self.elevated_hit_bonus  += self.settings.grunt_elevated_hit_bonus
+        self.elev_defense_malus  += self.settings.grunt_elev_defense_malus
+        self.overwatch_penalty   += self.settings.grunt_overwatch_penalty
+        self.max_overwatch       += self.settings.grunt_max_overwatch
+
+
+################################################################################
+# THE MAP
+################################################################################
+
+class MapState:
+    """the map's tiles and the precomputed data about them"""
+
+    # GameMap swaps in the classes that can draw themselves
+    tile_class   = TileState
+    unit_classes = {'basic':  UnitState,
+                    'sniper': SniperState,
+                    'scout':  ScoutState,
+                    'grunt':  GruntState}
+
+    def __init__(self, lf_game, filename):
+        """initialize the map from a file"""
+        self.lf_game  = lf_game
+        self.settings = lf_game.settings
+
+        self.filename        = filename
+
+        # initialize tracking variables
+        self.tiles           = []
+        self.walls           = []
+        self.start_positions = []
+        self.bases           = {self.settings.teams[0]: [],
+                                self.settings.teams[1]: []}
+
+        # initialize the map
+        self._read_map()
+
+        # build the all_walls list for simpler looping
+        self.all_walls = []
+        for row in self.walls:
+            for wall in row:
+                self.all_walls.append(wall)
+
+        # index the walls by grid position, so a sight line only has to
+        #   check the walls in the cells it actually passes through
+        self.wall_grid = [[None] * len(row) for row in self.tiles]
+        for wall in self.all_walls:
+            self.wall_grid[wall.row][wall.col] = wall
+
+        # build the all_tiles list for simpler looping
+        self.all_tiles = []
+        for row in self.tiles:
+            for tile in row:
+                self.all_tiles.append(tile)
+
+        # then determine adjoiners
+        self.determine_adjoiners()
+
+        # precompute every tile's line-of-sight once, so moving a unit
+        #   only needs to look up its new tile's row of the table; the
+        #   table is cached on disk by terrain, so usually it's just loaded
+        load_los_table(self)
+
+        # tiles that have become walls or stopped being walls since the
+        #   table was last brought up to date, and whether they were walls
+        #   then; see change_terrain() and refresh_los_table()
+        self.los_changes = {}
+
+
+
+    def determine_adjoiners(self):
+        """determine what's occupying the 8 tiles adjacent to each tile
+
+        adjoiner_index lists, for each tile in all_tiles, the index of its
+            neighbor in each of the ADJOINER_DIRECTIONS (-1 off the map)
+        adjoiner_tiles lists the same neighbors as tiles, with EDGE_TILE
+            standing in for anything off the map"""
+        offsets = ((-1, 0), (1, 0), (0, 1), (0, -1),       # n, s, e, w
+                   (-1, -1), (-1, 1), (1, -1), (1, 1))     # nw, ne, sw, se
+        self.adjoiner_index = []
+        self.adjoiner_tiles = []
+        for tile in self.all_tiles:
+            indices   = []
+            adjoiners = []
+            for d_row, d_col in offsets:
+                r = tile.row + d_row
+                c = tile.col + d_col
+                if 0 <= r < len(self.tiles) and 0 <= c < len(self.tiles[r]):
+                    indices.append(self.tiles[r][c].index)
+                    adjoiners.append(self.tiles[r][c])
+                else:
+                    indices.append(-1)
+                    adjoiners.append(EDGE_TILE)
+            self.adjoiner_index.append(tuple(indices))
+            self.adjoiner_tiles.append(tuple(adjoiners))
+
+
+
+    def change_terrain(self, tile, new_type):
+        """change a tile's terrain (for the Map Editor), keeping the walls
+        up to date and noting the change for the LOS table, which only
+        works out the pairs of tiles it affects once somebody looks (see
+        refresh_los_table); the adjoiners hold the tiles themselves, so
+        they never need working out again"""
+        was_wall = tile.type == 'wall'
+        tile.change_type(new_type)
+        if was_wall == (new_type == 'wall'):
+            return
+
+        if was_wall:
+            self.walls[tile.row].remove(tile)
+            self.all_walls.remove(tile)
+            self.wall_grid[tile.row][tile.col] = None
+        else:
+            self.walls[tile.row].append(tile)
+            self.all_walls.append(tile)
+            self.wall_grid[tile.row][tile.col] = tile
+
+        # the LOS table catches up the next time anybody looks at it
+        self.los_changes.setdefault(tile, was_wall)
+        # it's a different map now, as far as anything shared by key goes
+        self.terrain_key = map_key(self)
+
+
+
+    def build_teams(self, lf_game):
+        """place the units on the map"""
+        for index, start_position in enumerate(self.start_positions):
+            unit_class = self.unit_classes[start_position['class']]
+            unit = unit_class(self, team = start_position['team'])
+            # the unit's place in the map's list of start positions
+            unit.index = index
+
+            # assign the tile to the unit
+            row = start_position['row']
+            col = start_position['col']
+            unit.tile = self.tiles[row][col]
+            unit.tile.occupied = unit
+
+            # figure out what tiles the unit can reach and see
+            determine_range(self, unit)
+            determine_los(self, unit)
+
+            # determine if the unit is in cover
+            unit.check_cover()
+
+            if unit.tile.type == 'elevated':
+                unit.elevated = True
+
+            # add unit to the proper team and the master list
+            team = unit.team
+            lf_game.teams[team].add(unit)
+            lf_game.all_units.append(unit)
+
+            # team 2 begins the game on overwatch
+            if unit.team == self.settings.teams[1]:
+                unit.current_ap = -unit.max_overwatch
+
+
+
+    def eliminate_unit(self, unit):
+        """delete the unit IF there are no friendly bases on the map"""
+
+        if len(self.bases[unit.team]) == 0:
+            print(f'{unit.unit_class} eliminated! Team has no recharging base')
+            self.lf_game.teams[unit.team].remove(unit)
+            if unit in self.lf_game.all_units:
+                self.lf_game.all_units.remove(unit)
+            unit.tile.occupied = False
+            self.lf_game.tracker.unit_removed(unit)
+            return True
+        return False
+
+
+################################################################################
+# PROTECTED METHODS USED BY __init__()
+################################################################################
+
+    def _read_map(self):
+        """loads a map in the JSON or the binary (.lfm) format"""
+        map_json = load_map(self.filename)
+
+        # try to load team colors & score limits; otherwise just keep defaults
+        try:
+            self.settings.team_names     = map_json['team_names']
+            self.settings.team_color     = map_json['team_color']
+            self.settings.alt_team_color = map_json['alt_team_color']
+            self.settings.b_w_team_color = map_json['b_w_team_color']
+            self.settings.score_limit    = map_json['score_limit']
+        except:
+            pass
+
+        # which teams can recharge on each type of base
+        teams = self.settings.teams
+        base_teams = {'base_u': teams,
+                      f'base_{teams[0]}': [teams[0]],
+                      f'base_{teams[1]}': [teams[1]]}
+
+        tile_ID = 0
+        row_of_tiles = []
+        for r, row in enumerate(map_json['tiles']):
+            row_of_tiles = []
+            row_of_walls = []
+
+            for c, tile in enumerate(row):
+                tile_ID += 1
+                tile_data = {'row':  r, 'col': c,
+                             'type': tile, 'ID': tile_ID, 'occupied': False}
+                # create the tile and add it to the row
+                new_tile = self.tile_class(self, tile_data)
+                row_of_tiles.append(new_tile)
+
+                # if it's a wall add it to that list
+                if tile == 'wall':
+                    row_of_walls.append(new_tile)
+
+                # if it's a base add it to its teams' lists
+                elif tile in base_teams:
+                    for team in base_teams[tile]:
+                        self.bases[team].append(new_tile)
+
+            # add the rows to the master lists
+            self.tiles.append(row_of_tiles)
+            self.walls.append(row_of_walls)
+
+        for unit in map_json['units']:
+            start_position = {'row': unit[2], 'col': unit[3],
+                        'team': unit[0], 'class': unit[1]}
+            self.start_positions.append(start_position)
+
+
+
+
+
+
+    # def _superseded_read_map(self):
+    #     """Loads a map in ASCII format"""
+    #     f = open(self.filename, 'r')
+    #     tile_ID = 0
+    #     for r, row in enumerate(f.readlines()):
+    #         row_list = row.split()
+    #         row_of_tiles = []
+    #         row_of_walls = []
+    #         for c, code in enumerate(row_list):
+    #             tile_ID += 1
+
+    #             # initialize tile data
+    #             tile_data = {'row': r, 'col': c, 'occupied': False,
+    #                 'type': self.settings.tile_dict[code], 'ID': tile_ID}
+
+    #             if 'unit' in tile_data['type']:
+    #                 unit_data = tile_data['type'].split('_')
+    #                 unit_team = unit_data[1]
+    #                 unit_class = unit_data[2]
+    #                 start_position = {'row': r, 'col': c,
+    #                     'team': unit_team, 'class': unit_class}
+    #                 self.start_positions.append(start_position)
+    #                 tile_data['type'] = 'level'
+
+    #             # create the tile and add it to the row
+    #             new_tile = Tile(self, tile_data)
+    #             row_of_tiles.append(new_tile)
+
+    #             # if it's a wall add it to that list
+    #             if 'wall' in new_tile.type:
+    #                 row_of_walls.append(new_tile)
+
+    #             # if it's a base add it to that list
+    #             elif 'base' in new_tile.type:
+    #                 if '_u' in new_tile.type:
+    #                     self.bases[self.settings.teams[0]].append(new_tile)
+    #                     self.bases[self.settings.teams[1]].append(new_tile)
+    #                 elif f'_{self.settings.teams[0]}' in new_tile.type:
+    #                     self.bases[self.settings.teams[0]].append(new_tile)
+    #                 elif f'_{self.settings.teams[1]}' in new_tile.type:
+    #                     self.bases[self.settings.teams[1]].append(new_tile)
+
+
+
+
+    #         # add the rows to the master lists
+    #         self.tiles.append(row_of_tiles)
+    #         self.walls.append(row_of_walls)
+    #     f.close()
+
+    #     print(f"loaded map {self.filename}")
+    #     print(f"team 1 bases: {self.bases[self.settings.teams[0]]}")
+    #     print(f"team 2 bases: {self.bases[self.settings.teams[1]]}")
+
+
+################################################################################
+# THE MATCH
+################################################################################
+
+class Team(list):
+    """one team's units, in the order they were placed; has the add() and
+    remove() of the pygame sprite Groups that LaserFlag uses instead"""
+
+    def add(self, unit):
+        self.append(unit)
+
+
+
+class GameState:
+    """everything about a match in progress: the map, the units, the score,
+    whose turn it is and any overwatch shots waiting to be fired"""
+
+    map_class = MapState
+
+    def __init__(self, map_file, settings = None, seed = None):
+        """load the map and place the units for the first turn; the match
+        draws all its dice and shuffles from one random stream, so the
+        same seed and the same actions always play out the same"""
+        if settings is None:
+            settings = Settings()
+        self.settings = settings
+        self.map_file = map_file
+
+        if seed is None:
+            seed = random.randrange(2**32)
+        self.seed = seed
+        self.rng  = random.Random(seed)
+
+        # every action and its dice, in order; see record()
+        self.log = []
+
+        self.game_map = self.map_class(self, map_file)
+
+        # track if running overwatch mode
+        self.overwatch_mode = False
+        self.overwatch_list = []
+
+        # initialize the game board for the first turn
+        self.turn_number     = 1
+        self.all_units       = []
+        self.teams           = {self.settings.teams[0]: self._new_team(),
+                                self.settings.teams[1]: self._new_team()}
+        self.scores          = {self.settings.teams[0]: 0,
+                                self.settings.teams[1]: 0}
+        self.active_team     =  self.settings.teams[0]
+        self.inactive_team   =  self.settings.teams[1]
+        self.game_map.build_teams(self)
+
+        # every unit the map started with, in start position order; unlike
+        #   all_units, eliminated units stay in here
+        self.roster = list(self.all_units)
+
+        # the units and the map keep this up to date from here on
+        self.tracker = VictoryTracker(self)
+
+
+    def _new_team(self):
+        """an empty container for one team's units"""
+        return Team()
+
+
+
+################################################################################
+# SNAPSHOTS
+################################################################################
+
+def snapshot(game):
+    """the state of a match, between actions, as plain hashable data:
+    (turn_number, active_team, scores, units) where scores is in team order
+    and units has an entry for every unit in game.roster; None once the
+    unit has been eliminated, else (tile index, AP, can_move,
+    laser_charged, laser_uncharged, laser_charging)"""
+    units = []
+    for unit in game.roster:
+        if unit in game.teams[unit.team]:
+            units.append((unit.tile.index, unit.current_ap, unit.can_move,
+                          unit.laser_charged, unit.laser_uncharged,
+                          unit.laser_charging))
+        else:
+            units.append(None)
+    return (game.turn_number, game.active_team,
+            tuple(game.scores[team] for team in game.teams), tuple(units))
+
+
+def restore(game, state):
+    """put a match (on the same map) back the way snapshot() found it"""
+    turn_number, active_team, scores, units = state
+    game_map = game.game_map
+
+    game.turn_number = turn_number
+    game.active_team, game.inactive_team = active_team, [
+        team for team in game.teams if team != active_team][0]
+    game.scores = dict(zip(game.teams, scores))
+    game.overwatch_mode = False
+    game.overwatch_list = []
+
+    # clear the board, then put everyone back
+    for unit in game.roster:
+        if unit.tile is not None and unit.tile.occupied is unit:
+            unit.tile.occupied = False
+    teams = {team: game._new_team() for team in game.teams}
+    game.all_units = []
+    for unit, unit_state in zip(game.roster, units):
+        if unit_state is None:
+            continue
+        (tile_index, unit.current_ap, unit.can_move, unit.laser_charged,
+         unit.laser_uncharged, unit.laser_charging) = unit_state
+        unit.tile          = game_map.all_tiles[tile_index]
+        unit.tile.occupied = unit
+        unit.elevated      = unit.tile.type == 'elevated'
+        unit.reach_cost    = None
+        unit.check_cover()
+        teams[unit.team].add(unit)
+        game.all_units.append(unit)
+    game.teams = teams
+
+    # ranges depend on where everyone else is, so they go last
+    for unit in game.all_units:
+        determine_range(game_map, unit)
+        determine_los(game_map, unit)
+    game.tracker.recount()
+
+
+################################################################################
+# VICTORY CONDITIONS
+################################################################################
+
+class VictoryTracker:
+    """counts what the victory conditions depend on (units left, units
+    with a laser that works or is recharging, and free bases, per team) so
+    they can be checked without looking at every unit and base. The units,
+    the map and fire() report every change, and result is worked out again
+    straight away"""
+
+    def __init__(self, game):
+        self.game = game
+        self.recount()
+
+
+    def recount(self):
+        """count everything from scratch"""
+        game = self.game
+
+        # which teams can recharge on each base tile
+        self.base_teams = {}
+        for team in game.teams:
+            for tile in game.game_map.bases[team]:
+                self.base_teams.setdefault(tile, []).append(team)
+
+        self.units      = {}
+        self.lasers     = {}
+        self.free_bases = {}
+        for team in game.teams:
+            self.units[team]  = len(game.teams[team])
+            self.lasers[team] = 0
+            for unit in game.teams[team]:
+                if not unit.laser_uncharged:
+                    self.lasers[team] += 1
+            self.free_bases[team] = 0
+            for tile in game.game_map.bases[team]:
+                if not tile.occupied:
+                    self.free_bases[team] += 1
+        self.update()
+
+
+    def tile_vacated(self, tile):
+        for team in self.base_teams.get(tile, ()):
+            self.free_bases[team] += 1
+        self.update()
+
+    def tile_taken(self, tile):
+        for team in self.base_teams.get(tile, ()):
+            self.free_bases[team] -= 1
+        self.update()
+
+    def laser_lost(self, unit):
+        self.lasers[unit.team] -= 1
+        self.update()
+
+    def laser_regained(self, unit):
+        self.lasers[unit.team] += 1
+        self.update()
+
+    def unit_removed(self, unit):
+        """a unit left the map (its tile is already free)"""
+        self.units[unit.team] -= 1
+        if not unit.laser_uncharged:
+            self.lasers[unit.team] -= 1
+        self.tile_vacated(unit.tile)
+
+
+    def update(self):
+        """work out the result from the counts; the same conditions, in
+        the same order, as the full scan check_victory used to do"""
+        game = self.game
+        self.result = None
+        for team in game.teams:
+
+            # score victory
+            if game.scores[team] >= game.settings.score_limit[team]:
+                self.result = 'score', team, None
+
+            # elimination victory
+            elif self.units[team] == 0:
+                self.result = 'elimination', None, team
+
+            # checkmate victory: no active lasers, and nowhere to recharge
+            elif self.lasers[team] == 0 and self.free_bases[team] == 0:
+                self.result = 'checkmate', None, team
+
+            if self.result:
+                return
+
+
+
+################################################################################
+# PLAYING A MATCH
+#   these work on a GameState, or anything with the same attributes, so
+#   LaserFlag runs its matches through them too
+################################################################################
+
+def quietly():
+    """a with-block that throws away what the rules print, for matches
+    played with nobody watching"""
+    return redirect_stdout(StringIO())
+
+
+def record(game, *entry):
+    """append an entry to the match's action log; units are logged by
+    their index in game.roster and tiles by their index in
+    game_map.all_tiles (see replay.py for the entries)"""
+    if game.log is not None:
+        game.log.append(entry)
+
+
+
+def calc_to_hit(settings, shooter = None, target = None, overwatch = False,
+                in_cover = None):
+    """the roll modifiers for a shot, and the dice total needed to hit;
+    in_cover says whether the target has cover against the shooter, if it
+    shouldn't be worked out from the tiles they're standing on"""
+    to_hit = {'to-hit'           : settings.base_to_hit,
+              'elevated_hit_bonus' : 0,
+              'cover_defense_bonus': 0,
+              'elev_defense_malus' : 0,
+              'total'              : 0,
+              'overwatch_penalty'  : 0}
+
+    if shooter:
+        to_hit['to-hit'] = shooter.to_hit
+        # if shooter is on elevated ground
+        if shooter.elevated:
+            to_hit['elevated_hit_bonus']   = shooter.elevated_hit_bonus
+        # if this is an overwatch shot
+        if overwatch:
+            to_hit['overwatch_penalty']    = shooter.overwatch_penalty
+
+    if target:
+        # if target is covered in the shooter's direction
+        if in_cover is None:
+            in_cover = target.is_in_cover(shooter)
+        if in_cover:
+            to_hit['cover_defense_bonus']  = target.cover_defense_bonus
+        # if target is on elevated ground
+        if target.elevated:
+            to_hit['elev_defense_malus']   = target.elev_defense_malus
+
+    to_hit['total'] = (to_hit['to-hit'] +
+                       to_hit['elevated_hit_bonus'] +
+                       to_hit['cover_defense_bonus'] +
+                       to_hit['elev_defense_malus'] +
+                       to_hit['overwatch_penalty'])
+    return to_hit
+
+
+
+def move_unit(game, unit, tile):
+    """spend one AP to move the unit to a tile within its walking range;
+    returns False (and does nothing) if it can't go there"""
+    if not unit.can_move or unit.current_ap <= 0 or tile == unit.tile:
+        return False
+    # other units may have moved since the range was last worked out
+    determine_range(game.game_map, unit)
+    if tile not in unit.tile_distance:
+        return False
+    unit.move(game.game_map, tile)
+    record(game, 'move', unit.index, tile.index)
+    return True
+
+
+
+def fire(game, shooter, target, overwatch = False):
+    """fire the shooter's laser at the target and roll to hit; a hit scores
+    a point, and ends the overwatch phase if it was an overwatch shot
+
+    returns the shooter, the dice, the to-hit modifiers and whether it was
+    a hit"""
+    shooter.fire(overwatch)
+
+    # roll dice
+    roll   = roll_dice(game.settings.dice, game.rng)
+    to_hit = calc_to_hit(game.settings, shooter, target, overwatch)
+    hit    = sum(roll) >= to_hit['total']
+    record(game, 'fire', shooter.index, target.index, overwatch, tuple(roll),
+           hit)
+    if hit:
+        target.hit()
+        game.scores[shooter.team] += 1
+        game.tracker.update()
+        if overwatch:
+            end_overwatch(game)
+
+    return {'shooter': shooter, 'roll': roll, 'to_hit': to_hit, 'hit': hit}
+
+
+
+def begin_overwatch(game, target):
+    """fill the list of the inactive team's units that get a snap shot at
+    the target after its move or shot, in random order"""
+
+    # don't run overwatch mode if the unit has no laser
+    if target.laser_uncharged:
+        end_overwatch(game)
+        return
+
+    game.overwatch_mode = True
+    game.overwatch_list = []
+
+    # each unit on overwatch gets one shot per enemy move
+    for shooter in game.teams[game.inactive_team]:
+
+        # negative AP denotes active overwatch
+        if shooter.current_ap >= 0: continue
+        if target.tile in shooter.visible_tiles:
+            game.overwatch_list.append(shooter)
+
+    # randomize the list of shooters
+    game.rng.shuffle(game.overwatch_list)
+    record(game, 'overwatch', target.index,
+           tuple(shooter.index for shooter in game.overwatch_list))
+
+
+
+def next_overwatch(game):
+    """the next unit to take its overwatch shot, or None once everyone has
+    (which ends the overwatch phase)"""
+    if not game.overwatch_mode or len(game.overwatch_list) == 0:
+        end_overwatch(game)
+        return None
+    return game.overwatch_list.pop(0)
+
+
+
+def end_overwatch(game):
+    """end overwatch mode and go back to normal selection mode"""
+    game.overwatch_mode = False
+    game.overwatch_list = []
+
+
+
+def resolve_overwatch(game, target):
+    """fire every overwatch shot at the target in turn, until one hits;
+    returns the results of the shots that were fired"""
+    results = []
+    shooter = next_overwatch(game)
+    while shooter:
+        results.append(fire(game, shooter, target, overwatch=True))
+        shooter = next_overwatch(game)
+    return results
+
+
+
+def end_turn(game):
+    """hand the turn to the other team"""
+    # swap active teams
+    game.active_team, game.inactive_team = swap(
+        game.active_team, game.inactive_team)
+
+    # set the now inactive team's APs for overwatch mode
+    for unit in game.teams[game.inactive_team]:
+        unit.end_turn()
+
+    # refill the now active team's action points and action flags
+    for unit in game.teams[game.active_team]:
+        unit.begin_turn()
+
+    game.turn_number += 1
+    record(game, 'end')
+
+
+
+def check_victory(game):
+    """check if any of the three victory conditions have been met; returns
+    (victory_type, winner, loser) with the team that isn't known as None,
+    or None if the match goes on"""
+    return game.tracker.result
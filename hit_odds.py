@@ -0,0 +1,139 @@
+# hit_odds.py
+
+"""exact odds of hitting with a laser, for any number of dice with any
+number of sides (settings.dice)
+
+run it on its own to write a chart of every shooter, target, elevation,
+cover and overwatch combination for the current settings to roll_charts/"""
+
+from fractions import Fraction
+from functools import lru_cache
+
+from settings import Settings
+from game_state import MapState, calc_to_hit
+
+
+################################################################################
+# DICE
+################################################################################
+
+@lru_cache(maxsize=None)
+def roll_counts(dice):
+    """the number of ways to roll each total with dice = (number, sides);
+    index i of the result holds the ways to roll a total of i"""
+    number, sides = dice
+    # one die at a time: convolve the totals so far with one more die
+    counts = [1]
+    for _ in range(number):
+        new_counts = [0] * (len(counts) + sides)
+        for total, ways in enumerate(counts):
+            if not ways: continue
+            for face in range(1, sides + 1):
+                new_counts[total + face] += ways
+        counts = new_counts
+    return tuple(counts)
+
+
+@lru_cache(maxsize=None)
+def _ways_at_least(dice):
+    """index i holds the number of ways to roll a total of i or more"""
+    ways_at_least = []
+    running = 0
+    for ways in reversed(roll_counts(dice)):
+        running += ways
+        ways_at_least.append(running)
+    ways_at_least.reverse()
+    return tuple(ways_at_least)
+
+
+def chance_to_roll(needed, dice = (2, 6)):
+    """the exact chance (a Fraction) of rolling needed or more"""
+    dice = tuple(dice)
+    ways_at_least = _ways_at_least(dice)
+    if needed <= 0:
+        return Fraction(1)
+    if needed >= len(ways_at_least):
+        return Fraction(0)
+    return Fraction(ways_at_least[needed], ways_at_least[0])
+
+
+
+################################################################################
+# SHOTS
+################################################################################
+
+def hit_chance(settings, shooter = None, target = None, overwatch = False,
+               in_cover = None):
+    """the exact chance of the shooter hitting the target, with the same
+    modifiers fire() uses; returns (total needed, chance)"""
+    total = calc_to_hit(settings, shooter, target, overwatch, in_cover)['total']
+    return total, chance_to_roll(total, settings.dice)
+
+
+class _StatsOnly:
+    """just enough of a map to build units from the settings"""
+    def __init__(self, settings):
+        self.settings = settings
+
+
+def odds_table(settings):
+    """the odds for every shooter/target class pair and every combination of
+    shooter elevated, target elevated, target in cover and overwatch
+
+    keys are (shooter_class, target_class, shooter_elevated,
+    target_elevated, target_in_cover, overwatch); values are (total
+    needed, chance)"""
+    no_map = _StatsOnly(settings)
+    shooters = {unit_class: unit_type(no_map, settings.teams[0])
+                for unit_class, unit_type in MapState.unit_classes.items()}
+    targets  = {unit_class: unit_type(no_map, settings.teams[1])
+                for unit_class, unit_type in MapState.unit_classes.items()}
+
+    table = {}
+    for shooter_class, shooter in shooters.items():
+        for target_class, target in targets.items():
+            for shooter_elevated in (False, True):
+                for target_elevated in (False, True):
+                    shooter.elevated = shooter_elevated
+                    target.elevated  = target_elevated
+                    for in_cover in (False, True):
+                        for overwatch in (False, True):
+                            key = (shooter_class, target_class,
+                                   shooter_elevated, target_elevated,
+                                   in_cover, overwatch)
+                            table[key] = hit_chance(settings, shooter,
+                                                    target, overwatch, in_cover)
+    return table
+
+
+def write_chart(settings, filename):
+    """write the odds_table as text, one block per shooter class"""
+    table = odds_table(settings)
+    number, sides = settings.dice
+    situations = ((False, False, '  normal'), (True,  False, '  target elevated'),
+                  (False, True,  '  target in cover'), (True, True,  '  target elev. + cover'))
+    with open(filename, 'w') as f:
+        f.write(f"Rolling {number} {sides}-sided dice "
+                f"(base roll {settings.base_to_hit})\n\n")
+        for shooter_class in MapState.unit_classes:
+            f.write(f"{shooter_class.upper()} as shooter\n")
+            for target_class in MapState.unit_classes:
+                f.write(f" vs {target_class}\t\tnormal\t\tshooter elevated"
+                        f"\tnormal snap shot\televated snap shot\n")
+                for target_elevated, in_cover, label in situations:
+                    line = f"{label:24}"
+                    for overwatch in (False, True):
+                        for shooter_elevated in (False, True):
+                            total, chance = table[(shooter_class, target_class,
+                                shooter_elevated, target_elevated, in_cover,
+                                overwatch)]
+                            line += f"\t{total} ({float(chance):6.1%})"
+                    f.write(line + '\n')
+            f.write('\n\n')
+
+
+
+if __name__ == '__main__':
+    settings = Settings()
+    number, sides = settings.dice
+    write_chart(settings, f'roll_charts/{number}D{sides}_base{settings.base_to_hit}.txt')
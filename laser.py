@@ -20,14 +20,19 @@ class Laser:
         self.width = self.settings.laser_width
 
 
-    def draw(self):
-        """draw the laser on the screen; need to flip afterward though"""
-        pygame.draw.line(self.screen, self.color_1,
+    def draw(self, surface=None):
+        """draw the laser on the screen, or on another surface; need to
+        update the display afterward though, so return the rect the laser
+        was drawn in"""
+        if surface is None:
+            surface = self.screen
+        rect = pygame.draw.line(surface, self.color_1,
             (self.A.x, self.A.y),
             (self.B.x, self.B.y), self.width*5)
-        pygame.draw.line(self.screen, self.color_2,
+        pygame.draw.line(surface, self.color_2,
             (self.A.x, self.A.y),
             (self.B.x, self.B.y), self.width*3)
-        pygame.draw.line(self.screen, self.color_3,
+        pygame.draw.line(surface, self.color_3,
             (self.A.x, self.A.y),
             (self.B.x, self.B.y), self.width)
+        return rect
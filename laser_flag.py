@@ -2,6 +2,7 @@
 
 import os
 import sys
+import time
 import random
 import pygame
 
@@ -10,19 +11,35 @@ import tkinter.simpledialog
 from settings import Settings
 from game_map import GameMap
 from button_frame import ButtonFrame#, Button
-from lf_functions import (Point, Line, D6, game_caption, swap,
-    tile_direction, determine_range, CARDINALS)
+from lf_functions import (Point, Line, game_caption, tile_direction,
+    determine_range, CARDINALS)
+from game_state import (GameState, record, snapshot, calc_to_hit, move_unit,
+    fire, begin_overwatch, next_overwatch, end_turn, check_victory)
 from rules import Rules
 from laser import Laser
 from victory import Victory
+from hit_odds import chance_to_roll
+from mcts_ai import AIPlayer
+from replay import save_log
+from save_game import SAVE_EXTENSION, save_game, resume
 
+# posted by a timer when the next overwatch shot is due
+OVERWATCH_EVENT = pygame.USEREVENT + 1
 
 
-class LaserFlag:
-    """overall class to manage game assets and behavior"""
+class LaserFlag(GameState):
+    """overall class to manage game assets and behavior; the state of the
+    match and its rules are in GameState"""
 
-    def __init__(self, map_file):
-        """initialize game and create resources"""
+    # build a map that can draw itself
+    map_class = GameMap
+
+    def __init__(self, map_file, ai_teams = (), seed = None, replay = None,
+                 saved = None):
+        """initialize game and create resources; the computer plays any
+        teams in ai_teams, replay is a match log to play back (with the
+        seed it was played with) and saved is a match to carry on, as
+        save_game.load_game() reads it"""
         pygame.init()
         self.settings = Settings()
         self.screen = pygame.display.set_mode(
@@ -30,10 +47,20 @@ class LaserFlag:
         res = f"{self.settings.screen_width}x{self.settings.screen_height}"
         pygame.display.set_caption(game_caption())
 
+        # load the map and place the units for the first turn
+        if saved:
+            seed = saved['seed']
+        super().__init__(map_file, self.settings, seed)
+        if saved:
+            self._resume_game(saved)
+
         # initialize the main display regions
-        self.game_map = GameMap(self, map_file)
         self.button_frame = ButtonFrame(self)
         self.button_frame.create_buttons(self)
+        # only the active team's END TURN button shows (a resumed match may
+        #   be on either team's turn)
+        for team in self.teams:
+            self.turn_button[team].visible = team == self.active_team
 
         # don't show the rules frame
         self.rules = Rules(self)
@@ -42,9 +69,19 @@ class LaserFlag:
         # don't show the roll result
         self.show_roll_result = False
 
-        # track if running overwatch mode
-        self.overwatch_mode = False
-        self.overwatch_list = []
+        # track what changed since the last frame, so only those parts of
+        #   the display need updating; the first frame updates everything
+        self.dirty_rects = []
+        self.full_update = True
+        self.unit_rects  = {}
+        self.rules_shown = False
+
+        # the laser being animated, if any; see _animate_laser()
+        self.firing_laser    = None
+        self.laser_frames    = 0
+        self.next_frame_time = 0
+        self.roll_message    = ''
+        self.clock           = pygame.time.Clock()
 
         # to track the user selection
         self.selected_unit      = None
@@ -53,22 +90,32 @@ class LaserFlag:
         # initialize the dictionary of to-hit variables for roll display
         self._clear_to_hit()
 
+        # computer players think in their own processes; see _run_ai()
+        self.ai_players = {team: AIPlayer(map_file, team,
+                                          self.settings.ai_reuse_tree)
+                           for team in ai_teams}
+        self.ai_thinking    = False
+        self.turn_start     = pygame.time.get_ticks()
+
+        # the log entries still to be played back; see _run_replay()
+        self.replaying      = replay is not None
+        self.replay         = list(replay or ())
+        self.replay_fast    = False
+        self.next_replay    = 0
+
         # initialize the game board for the first turn
-        self.turn_number     = 1
-        self.all_units       = []
-        self.teams           = {self.settings.teams[0]: pygame.sprite.Group(),
-                                self.settings.teams[1]: pygame.sprite.Group()}
-        self.scores          = {self.settings.teams[0]: 0,
-                                self.settings.teams[1]: 0}
-        self.active_team     =  self.settings.teams[0]
-        self.inactive_team   =  self.settings.teams[1]
         self.showing_inactive_los = False
-        self.game_map.build_teams(self)
         self._generate_background_lasers()
         self._update_screen('init')
 
 
 
+    def _new_team(self):
+        """the units of each team go in a sprite group"""
+        return pygame.sprite.Group()
+
+
+
 ################################################################################
 # MAIN GAME LOOP
 ################################################################################
@@ -76,30 +123,57 @@ class LaserFlag:
 
 
     def run_game(self):
-        """the main game loop"""
+        """the main game loop; sleeps until there's an event to handle, and
+        only ticks at settings.fps while the laser is being animated"""
         while True:
             self._check_victory_conditions()
-            self._check_events()
-            if self.overwatch_mode and not self.show_roll_result:
-                self._next_overwatch()
+            if (self.firing_laser or self.settings.background_scroll or
+                    self.ai_thinking or self.replay):
+                self.clock.tick(self.settings.fps)
+                events = pygame.event.get()
+            else:
+                events = [pygame.event.wait(self.settings.idle_timeout)]
+                events += pygame.event.get()
+            self._check_events(events)
+            if self.firing_laser:
+                self._animate_laser()
+            elif self.settings.background_scroll:
+                self._scroll_background()
+            self._run_ai()
+            self._run_replay()
 
 
 
-    def _check_events(self):
+    def _check_events(self, events):
         """respond to keypresses & mouse events"""
-        for event in pygame.event.get():
+        for event in events:
 
             # if click on window X
             if event.type == pygame.QUIT:
                 self._quit_game()
 
+            # ignore the player while the laser is firing
+            elif self.firing_laser:
+                continue
+
+            # the next overwatch shot is due
+            elif event.type == OVERWATCH_EVENT:
+                if self.overwatch_mode and not self.show_roll_result:
+                    self._next_overwatch()
+
 
             # if keypress, quit game or clear selection
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_q:
                     self._quit_game()
+                if event.key == pygame.K_s and not self.replaying:
+                    self._save_game()
+                # the replay needs its selection; skip its animations instead
+                if self.replaying:
+                    self.replay_fast = not self.replay_fast
+                    continue
                 self._clear_selection()
-                self._update_screen()
+                self._update_screen('check events, on keypress')
 
 
             # if mouse click
@@ -113,6 +187,10 @@ class LaserFlag:
                 elif self.show_roll_result:
                     self._hide_roll_result()
 
+                # the computer is playing this turn, or the match is a replay
+                elif self.active_team in self.ai_players or self.replaying:
+                    pass
+
                 # otherwise, check the buttons and map
                 else:
                     mouse_pos = pygame.mouse.get_pos()
@@ -206,18 +284,50 @@ class LaserFlag:
 
 ###########################  MOVE THE SELECTED UNIT  ###########################
                 if self.selected_unit and tile.hilited:
-                    self.selected_unit.move(self.game_map, tile)
+                    move_unit(self, self.selected_unit, tile)
                     self._update_selected_unit()
                     self._begin_overwatch()
                 break
 
 
     def _quit_game(self):
-        """ends the game"""
+        """ends the game, saving the match log to settings.log_folder"""
+        for ai_player in self.ai_players.values():
+            ai_player.close()
+        if not self.replaying and self.log:
+            name = os.path.splitext(os.path.basename(self.map_file))[0]
+            filename = os.path.join(self.settings.log_folder,
+                f"{name} {time.strftime('%Y-%m-%d %H%M%S')}.json")
+            save_log(self, filename)
+            print(f'match log saved to {filename}')
         pygame.quit()
         sys.exit()
 
 
+################################################################################
+# SAVE AND RESUME
+################################################################################
+
+    def _save_game(self):
+        """save the match to settings.save_folder, if it's between actions"""
+        if self.overwatch_mode or self.show_roll_result or self.ai_thinking:
+            print("can't save until the current action is over")
+            return
+        name = os.path.splitext(os.path.basename(self.map_file))[0]
+        filename = os.path.join(self.settings.save_folder,
+            f"{name} {time.strftime('%Y-%m-%d %H%M%S')}{SAVE_EXTENSION}")
+        save_game(self, filename)
+        print(f'game saved to {filename}')
+
+
+    def _resume_game(self, saved):
+        """put the saved match on the board; called before the buttons and
+        the screen are set up, which then go by the restored match"""
+        resume(self, saved)
+        # place each unit's sprite on its tile
+        for unit in self.all_units:
+            unit.rect.topleft = unit.tile.rect.topleft
+
 ################################################################################
 # CHANGE TEAM NAME
 ################################################################################
@@ -242,21 +352,12 @@ class LaserFlag:
             self.turn_button[team].visible = not self.turn_button[team].visible
             self.status_label[team].prep_msg('')
 
-        # swap active teams
-        self.active_team, self.inactive_team = swap(
-            self.active_team, self.inactive_team)
-
-        # set the now inactive team's APs for overwatch mode
-        for unit in self.teams[self.inactive_team]:
-            unit.end_turn()
-
-        # refill the now active team's action points and action flags
-        for unit in self.teams[self.active_team]:
-            unit.begin_turn()
+        # swap active teams and reset everyone's action points
+        end_turn(self)
+        self.turn_start = pygame.time.get_ticks()
 
         # wrap up
         self._generate_background_lasers()
-        self.turn_number += 1
 
 
 
@@ -266,49 +367,13 @@ class LaserFlag:
 
     def _check_victory_conditions(self):
         """check if any of the three victory conditions have been met"""
-
-        for team in self.teams:
-
-            # score victory
-            if self.scores[team] >= self.settings.score_limit[team]:
-                victory = Victory(self, 'score', winner=team)
-                victory.show_victory()
-                # self._update_screen('score')
-                pygame.time.delay(5000)
-                self._quit_game()
-
-            # elimination victory
-            elif len(self.teams[team]) == 0:
-                victory = Victory(self, 'elimination', loser=team)
-                victory.show_victory()
-                # self._update_screen('elimination')
-                pygame.time.delay(5000)
-                self._quit_game()
-
-            # checkmate victory
-            else:
-
-                # check if any units on the team have an active laser
-                active_lasers = False
-                for unit in self.teams[team]:
-                    if not unit.laser_uncharged:
-                        active_lasers = True
-                        break
-
-                # if none do, check if they have any available bases
-                if not active_lasers:
-                    available_bases = False
-                    for tile in self.game_map.bases[team]:
-                        if not tile.occupied:
-                            available_bases = True
-                            break
-
-                    if not available_bases:
-                        victory = Victory(self, 'checkmate', loser=team)
-                        victory.show_victory()
-                        # self._update_screen('checkmate!')
-                        pygame.time.delay(5000)
-                        self._quit_game()
+        result = check_victory(self)
+        if result:
+            victory_type, winner, loser = result
+            victory = Victory(self, victory_type, winner=winner, loser=loser)
+            victory.show_victory()
+            pygame.time.delay(5000)
+            self._quit_game()
 
 
 ################################################################################
@@ -342,6 +407,7 @@ class LaserFlag:
         self._clear_selection()
         self.selected_unit = clicked_unit
         self.selected_unit.selected = True
+        record(self, 'select', clicked_unit.index)
         self._update_selected_unit()
 
 
@@ -357,7 +423,7 @@ class LaserFlag:
 
         # don't show range if unit has no AP
         if self.selected_unit.current_ap > 0 and self.selected_unit.can_move:
-            determine_range(self, self.selected_unit)
+            determine_range(self.game_map, self.selected_unit)
 
         # update active team status window
         self._calc_to_hit(shooter=self.selected_unit)
@@ -546,36 +612,16 @@ class LaserFlag:
 
     def _calc_to_hit(self, shooter = None, target = None):
         """calculate the current to-hit requirements"""
-        self._clear_to_hit()
-
-        if shooter:
-            self.to_hit['to-hit'] = shooter.to_hit
-            # if shooter is on elevated ground
-            if shooter.elevated:
-                self.to_hit['elevated_hit_bonus']   = shooter.elevated_hit_bonus
-            # if this is an overwatch shot
-            if self.overwatch_mode:
-                self.to_hit['overwatch_penalty']    = shooter.overwatch_penalty
-
-        if target:
-            # if target is covered in the shooter's direction
-            if target.is_in_cover(shooter):
-                self.to_hit['cover_defense_bonus']  = target.cover_defense_bonus
-            # if target is on elevated ground
-            if target.elevated:
-                self.to_hit['elev_defense_malus']   = target.elev_defense_malus
-
-        self.to_hit['total'] = (self.to_hit['to-hit'] +
-                                self.to_hit['elevated_hit_bonus'] +
-                                self.to_hit['cover_defense_bonus'] +
-                                self.to_hit['elev_defense_malus'] +
-                                self.to_hit['overwatch_penalty'])
+        self.to_hit = calc_to_hit(self.settings, shooter, target,
+                                  self.overwatch_mode)
 
 
 
     def _show_laser_button(self):
         self._calc_to_hit(shooter=self.selected_unit, target=self.targeted_unit)
-        msg = f"FIRE LASER (roll {self.to_hit['total']} or more)"
+        chance = chance_to_roll(self.to_hit['total'], self.settings.dice)
+        msg  = f"FIRE LASER (roll {self.to_hit['total']} or more)\n"
+        msg += f"{float(chance):.0%} chance to hit"
         self.laser_button.prep_msg(msg)
         # make the fire button visible if applicable
         if (self.selected_unit and
@@ -592,50 +638,65 @@ class LaserFlag:
 
     def _fire_laser(self, shooter, target):
         """fire the selected unit's laser"""
-        shooter.fire(self.overwatch_mode)
-
-        # roll dice
-        roll  = [D6(), D6()]
-        total = roll[0] + roll[1]
-        msg   = f"{roll[0]} + {roll[1]} = {total}"
-        self._calc_to_hit(shooter=shooter, target=target)
-        if total >= self.to_hit['total']:
-            hit = True
-            target.hit()
-            self.scores[shooter.team] += 1
+        # roll the dice; a hit scores, and ends any overwatch phase
+        result = fire(self, shooter, target, self.overwatch_mode)
+        roll   = result['roll']
+        hit    = result['hit']
+        self.to_hit = result['to_hit']
+        msg   = f"{' + '.join(str(die) for die in roll)} = {sum(roll)}"
+        if hit:
             msg += (f' (HIT) (needed {self.to_hit["total"]})\n')
         else:
-            hit = False
             msg += (f' (MISS) (needed {self.to_hit["total"]})\n')
         msg += '(click or keypress to continue)'
 
-        # animate laser
+        # animate laser; the main loop runs it with _animate_laser() and
+        #   shows the roll result message when it's done
         source_tile   = shooter.tile
         target_tile   = target.tile
         line_dict     = shooter.visible_tiles
         sight_line    = line_dict[target_tile]
-        # flash a few lasers, take enough time to see the shot before
-        #   displaying the roll result message
-        for i in range(0, 10):
-            laser = Laser(self, shooter.team,
-                sight_line.A, sight_line.B)
-            laser.draw()
-            pygame.display.flip()
-            pygame.time.delay(int(self.settings.animation_speed))
-            self._update_screen('laser animation')
-            pygame.time.delay(int(self.settings.animation_speed))
-
-        self._show_roll_result(msg)
+        self.firing_laser    = Laser(self, shooter.team,
+                                     sight_line.A, sight_line.B)
+        self.laser_frames    = 0 if self.replay_fast else 20
+        self.next_frame_time = pygame.time.get_ticks()
+        self.roll_message    = msg
 
         return hit
 
 
 
+    def _animate_laser(self):
+        """flash the firing laser a few times, taking enough time to see the
+        shot before displaying the roll result message"""
+        now = pygame.time.get_ticks()
+        if now < self.next_frame_time:
+            return
+        self.next_frame_time = now + int(self.settings.animation_speed)
+
+        # all done
+        if self.laser_frames == 0:
+            self.firing_laser = None
+            self._show_roll_result(self.roll_message)
+            return
+
+        # odd frames draw the laser, even frames erase it
+        self.laser_frames -= 1
+        if self.laser_frames % 2 == 1:
+            laser_rect = self.firing_laser.draw()
+            pygame.display.update(laser_rect)
+            self.dirty_rects.append(laser_rect)
+        else:
+            self._update_screen('laser animation')
+
+
+
     def _show_roll_result(self, msg):
         """display the result of the dice roll"""
         self.roll_result_message.prep_msg(msg)
         self.roll_result_message.visible = True
         self.show_roll_result = True
+        self.roll_result_time = pygame.time.get_ticks()
         self._update_screen('show roll result')
 
 
@@ -647,6 +708,10 @@ class LaserFlag:
             self._clear_selection()
         self._update_screen('hide roll result')
 
+        # keep resolving overwatch, one shot at a time
+        if self.overwatch_mode:
+            self._schedule_overwatch()
+
 
 
 ################################################################################
@@ -668,26 +733,17 @@ class LaserFlag:
 
     def _begin_overwatch(self):
         """fill the list of eligible snap-shooters and randomize it"""
+        begin_overwatch(self, self.selected_unit)
+        if self.overwatch_mode:
+            self._schedule_overwatch()
 
-        # don't run overwatch mode if the unit has no laser
-        if self.selected_unit.laser_uncharged:
-            self._end_overwatch()
-            return
-
-        self.overwatch_mode = True
-        self.overwatch_list = []
-
-        # each unit on overwatch gets one shot per enemy move
-        for shooter in self.teams[self.inactive_team]:
 
-            # negative AP denotes active overwatch
-            if shooter.current_ap >= 0 or shooter == None: continue #THE shooter==None SHOULNT BE NEEDED; WHY IS THERE AN EMPTY ITEM IN THE TEAM GROUP?
-            if self.selected_unit.tile in shooter.visible_tiles:
-                if shooter.current_ap <= -1:
-                    self.overwatch_list.append(shooter)
 
-        # randomize the list of shooters
-        random.shuffle(self.overwatch_list)
+    def _schedule_overwatch(self):
+        """post an OVERWATCH_EVENT after a short pause; shots fired while the
+        laser or a roll result is showing wait for _hide_roll_result()"""
+        pygame.time.set_timer(OVERWATCH_EVENT,
+                              int(self.settings.animation_speed), loops=1)
 
 
 
@@ -696,13 +752,10 @@ class LaserFlag:
 
         target = self.selected_unit
 
-        # if no overwatch shooters, end overwatch round
-        if len(self.overwatch_list) == 0:
-            self._end_overwatch()
-
-        else:
-            # take the first shooter from the list
-            shooter = self.overwatch_list.pop(0)
+        # take the next shooter from the list; if there are none left, the
+        #   overwatch round is over
+        shooter = next_overwatch(self)
+        if shooter:
 
             # calc to-hit
             self._calc_to_hit(shooter, target)
@@ -716,19 +769,148 @@ class LaserFlag:
             self.laser_button.prep_msg(msg)
             self.laser_button.visible = True
 
-            # roll the dice and fire the laser
-            hit = self._fire_laser(shooter, target)
+            # roll the dice and fire the laser; a hit ends overwatch mode
+            self._fire_laser(shooter, target)
 
-            # if a hit was scored, end overwatch mode
-            if hit:
-                self._end_overwatch()
+################################################################################
+# COMPUTER PLAYERS
+################################################################################
+
+
+
+    def _run_ai(self):
+        """if the computer is playing the active team, ask it for an action
+        and play it once it has decided; it waits while shots are being
+        fired and their results are showing"""
+        ai_player = self.ai_players.get(self.active_team)
+        if not ai_player:
+            return
+        if self.firing_laser or self.show_roll_result or self.overwatch_mode:
+            return
+
+        if not self.ai_thinking:
+            # think for ai_think_time per action, and ai_turn_time in all
+            spent = (pygame.time.get_ticks() - self.turn_start) / 1000
+            time_budget = min(self.settings.ai_think_time,
+                              self.settings.ai_turn_time - spent)
+            if time_budget <= 0:
+                self._increment_turn()
+                self._update_screen('ai out of time')
+                return
+            ai_player.ask(snapshot(self), time_budget)
+            self.ai_thinking = True
+            return
+
+        action = ai_player.poll()
+        if action is None:
+            return
+        self.ai_thinking = False
+        self._play_ai_action(action)
+
+
+
+    def _play_ai_action(self, action):
+        """play the computer's action the same way a player's clicks would"""
+        if action[0] == 'end':
+            self._increment_turn()
+            self._update_screen('ai end turn')
+            return
+
+        unit = self.roster[action[1]]
+        self._select_unit(unit)
+        if action[0] == 'move':
+            move_unit(self, unit, self.game_map.all_tiles[action[2]])
+            self._update_selected_unit()
+        else:
+            self._on_click_target(self.roster[action[2]])
+            if not self.targeted_unit:
+                # the worker's copy of the match disagrees; don't get stuck
+                print(f'computer player picked an impossible shot: {action}')
+                self._increment_turn()
+                self._update_screen('ai end turn')
+                return
+            self._fire_laser(self.selected_unit, self.targeted_unit)
+        self._begin_overwatch()
+        self._update_screen('ai action')
+
+
+
+################################################################################
+# REPLAYS
+################################################################################
+
+
+
+    def _run_replay(self):
+        """play back the next entry of the replayed log, through the same
+        steps as the player's clicks, once the last one has had time to be
+        seen; the snap shots play out on their own, as they always do"""
+        if not self.replay or self.firing_laser:
+            return
+        now = pygame.time.get_ticks()
+        pause = 0 if self.replay_fast else self.settings.replay_pause
+
+        # clear the roll result as if it had been clicked
+        if self.show_roll_result:
+            if now - self.roll_result_time >= pause:
+                self._hide_roll_result()
+                self.next_replay = now + pause
+            return
+        if self.overwatch_mode or now < self.next_replay:
+            return
+
+        entry  = self.replay.pop(0)
+        action = entry[0]
+        if action == 'select':
+            self._select_unit(self.roster[entry[1]])
+        elif action == 'move':
+            self._replay_select(self.roster[entry[1]])
+            if not move_unit(self, self.selected_unit,
+                             self.game_map.all_tiles[entry[2]]):
+                self._replay_desync(entry, "the unit can't move there")
+                return
+            self._update_selected_unit()
+            self._begin_overwatch()
+        elif action == 'fire' and not entry[3]:
+            shooter, target = self.roster[entry[1]], self.roster[entry[2]]
+            self._replay_select(shooter)
+            # target it afresh; after a miss the last shot's target is
+            #   still targeted, and clicking it again would untarget it
+            self._clear_target()
+            self._on_click_target(target)
+            if self.targeted_unit is not target:
+                self._replay_desync(entry, "the target can't be fired at")
+                return
+            self._fire_laser(shooter, target)
+            if self.log[-1] != entry:
+                self._replay_desync(entry, f'the shot went {self.log[-1]}')
+                return
+            self._begin_overwatch()
+        elif action == 'end':
+            self._increment_turn()
+        else:
+            # the overwatch order and the snap shots
+            return
+        self.next_replay = now + pause
+        self._update_screen('replay')
+        if not self.replay:
+            print('replay finished')
+
+
+
+    def _replay_select(self, unit):
+        """select the unit, if the log didn't (logs from self-play don't)"""
+        if self.selected_unit is not unit:
+            self._select_unit(unit)
+
+
+    def _replay_desync(self, entry, reason):
+        """the match has stopped following the log; say where, and stop
+        playing it back rather than carry on from the wrong state"""
+        print(f'replay out of step at {entry}: {reason}')
+        self.replay = []
 
 
-    def _end_overwatch(self):
-        """end overwatch mode and go back to normal selection mode"""
-        self.overwatch_mode = False
-        # if self.selected_unit.current_ap == 0:
-        #     self._clear_selection()
 
 ################################################################################
 # UPDATE SCREEN
@@ -737,47 +919,64 @@ class LaserFlag:
 
 
     def _update_screen(self, what_func):
-        """update images on the screen, and flip to the new screen"""
+        """update images on the screen, then update the parts of the display
+        that changed"""
 
         # for debugging; print the name of the function that called it
         print(what_func)
 
-        # draw the background color
-        self.screen.fill(self.settings.bg_color)
-
-        # draw lasers in the background
-        self._draw_background_lasers()
+        # draw the background color and lasers
+        self._draw_background()
 
         # draw the map
-        self.game_map.draw_map()
+        self.dirty_rects.extend(self.game_map.draw_map())
 
         # draw the units and update score labels
+        unit_rects = {}
         for team in self.teams:
             for unit in self.teams[team]:
                 unit.blitme()
+                unit_rects[unit] = unit.rect.copy()
 
             score_msg = f'{self.settings.team_names[team]}\n'
             score_msg += f'{self.scores[team]} / {self.settings.score_limit[team]}'
             self.score_label[team].prep_msg(score_msg)
 
+        # units can move, change state or be eliminated, so update both
+        #   where they were last frame and where they are now
+        self.dirty_rects.extend(self.unit_rects.values())
+        self.dirty_rects.extend(unit_rects.values())
+        self.unit_rects = unit_rects
+
         # draw the button frame
         self.button_frame.draw_frame()
 
         # draw any visible buttons
         for button in self.buttons:
-            button.draw_button()
+            button_rect = button.draw_button()
+            if button_rect:
+                self.dirty_rects.append(button_rect)
 
-        # show the rules screen
+        # show the rules screen; it covers nearly everything, so opening
+        #   or closing it updates the whole display
         if self.show_rules:
             self.rules.show()
+        if self.show_rules != self.rules_shown:
+            self.rules_shown = self.show_rules
+            self.full_update = True
 
         # show the result of the last dice roll
         if self.show_roll_result:
             self.roll_result_message.visible = True
         else: self.roll_result_message.visible = False
 
-        # make the most recently drawn screen visible
-        pygame.display.flip()
+        # make the changed parts of the most recently drawn screen visible
+        if self.full_update:
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dirty_rects)
+        self.dirty_rects = []
+        self.full_update = False
 
 
 
@@ -817,11 +1016,42 @@ class LaserFlag:
             laser = Laser(self, self.active_team, A, B)
             self.background_lasers.append(laser)
 
+        self._render_background()
+
 
-    def _draw_background_lasers(self):
-        """draw the lasers"""
+
+    def _render_background(self):
+        """draw the background color and this turn's lasers onto one surface,
+        which _update_screen starts each frame from"""
+        self.background = pygame.Surface(self.screen.get_size())
+        self.background.fill(self.settings.bg_color)
         for laser in self.background_lasers:
-            laser.draw()
+            laser.draw(self.background)
+        self.background_offset = 0
+        # the lasers run under the whole screen, so redraw all of it
+        self.full_update = True
+
+
+
+    def _draw_background(self):
+        """draw the background, wrapped around if it has been scrolled"""
+        x = self.background_offset
+        self.screen.blit(self.background, (x, 0))
+        if x:
+            self.screen.blit(self.background, (x - self.background.get_width(), 0))
+
+
+
+    def _scroll_background(self):
+        """slide the background along by settings.background_scroll pixels
+        per second; only redraws when it has moved a whole pixel"""
+        width  = self.background.get_width()
+        offset = (pygame.time.get_ticks() *
+                  self.settings.background_scroll // 1000) % width
+        if offset != self.background_offset:
+            self.background_offset = offset
+            self.full_update = True
+            self._update_screen('scroll background')
 
 
 ################################################################################
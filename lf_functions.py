@@ -2,8 +2,8 @@
 
 """several lengthy functions needed by Laser Flag"""
 
-import pygame
-from random import choice
+from math import floor, ceil
+from collections.abc import Mapping
 
 ################################################################################
 # MISC CLASSES, FUNCTIONS, AND CONSTANTS
@@ -18,6 +18,15 @@ INTERCARDINALS = {'nw': 'northwest',
                   'sw': 'southwest',
                   'se': 'southeast'}
 
+# the order of each tile's entry in game_map.adjoiner_tiles; the cardinals
+#   come first, and each diagonal lists the indices of the two cardinals
+#   it passes between
+ADJOINER_DIRECTIONS = (*CARDINALS, *INTERCARDINALS)
+DIAGONAL_SIDES = {4: (0, 3),    # nw: n, w
+                  5: (0, 2),    # ne: n, e
+                  6: (1, 3),    # sw: s, w
+                  7: (1, 2)}    # se: s, e
+
 class Point:
     def __init__(self, x, y):
         self.x = x
@@ -42,7 +51,11 @@ class Line:
         self.length = (self.rise**2 + self.run**2) ** 0.5
         return self.length
 
-def D6(): return choice(range(1, 7))
+def roll_dice(dice, rng):
+    """roll dice = (number, sides) with the random.Random rng and return
+    the list of faces"""
+    number, sides = dice
+    return [rng.choice(range(1, sides + 1)) for _ in range(number)]
 
 def game_caption():
     # generate caption for main screen
@@ -89,60 +102,95 @@ def determine_range(game_map, unit):
 
     # print(f"determining walking range for {unit.unit_class}...")
 
-    tile_size = game_map.settings.tile_size
-    home_tile = unit.tile
+    # tile_distance maps each reachable tile to the fewest steps it takes
+    # tile_steps is a list of lists; each sub-list holds the tiles first
+    #   reached on that step, starting with the home tile on its own
+    unit.tile_distance, unit.tile_steps = _walk_range(
+        game_map, unit, unit.tile, unit.elevated)
+
+
+def determine_reach(game_map, unit):
+    """determine the fewest AP the unit needs to reach each tile, using
+    whatever AP it has left this turn
 
-    # reachable_tiles is a list of lists
-    #   each sub-list contains all the tiles reachable in 1 step
-    #   first sub-list is the home tile
-    #   second sub-list is any of the surrounding 8 that are accessible
-    #   third sub-list is any reachable from there
-    unit.tile_steps     = [[home_tile]]
-    for step in range(0, unit.move_speed):
-        last_step = unit.tile_steps[step]
+    unit.reach_cost maps each reachable tile to its AP cost (0 for the
+        unit's own tile)
+    unit.reach_parent maps each reachable tile to the tile the unit moves
+        from on its last AP, so the route can be traced back"""
+    home_tile = unit.tile
+    budget    = unit.current_ap if unit.can_move else 0
+
+    unit.reach_cost   = {home_tile: 0}
+    unit.reach_parent = {home_tile: None}
+
+    # every AP is one more walk from the tiles first reached on the last
+    #   one; a walk only depends on where it starts, so this finds the
+    #   cheapest cost for every tile
+    frontier = [home_tile]
+    for ap in range(1, budget + 1):
+        next_frontier = []
+        for tile in frontier:
+            # the unit is elevated after a move if it stopped on cover
+            elevated = tile.type == 'elevated'
+            if tile == home_tile:
+                elevated = unit.elevated
+            tile_distance, tile_steps = _walk_range(
+                game_map, unit, tile, elevated)
+            for reached in tile_distance:
+                if reached in unit.reach_cost: continue
+                unit.reach_cost[reached]   = ap
+                unit.reach_parent[reached] = tile
+                next_frontier.append(reached)
+        frontier = next_frontier
+
+
+def _walk_range(game_map, unit, home_tile, elevated):
+    """flood fill the tiles the unit could walk to from home_tile with one
+    AP; returns the step distance to each one and the tiles on each step
+
+    the unit doesn't block its own tile, since it's left it by now"""
+    # diagonal steps may not end farther than move_speed - 1 tiles (as the
+    #   crow flies) from the home tile; compare squares to skip the root
+    max_diagonal = (unit.move_speed - 1) ** 2
+
+    tile_distance = {home_tile: 0}
+    tile_steps    = [[home_tile]]
+    for step in range(1, unit.move_speed + 1):
         this_step = []
-        for tile in last_step:
+        for tile in tile_steps[-1]:
             # if climbing onto elevated ground, end here (unless unit has climbing ability)
-            if tile.type == 'elevated' and not unit.elevated and not unit.can_climb: continue
-            # loop through the tile's dictionary of adjoining tiles
-            for direction, adj_tile in tile.adjoiners.items():
-                if (adj_tile.type != 'edge' and
-                    adj_tile.type != 'wall' and
-                    # adj_tile.type != 'base' and
-                    adj_tile not in last_step and
-                    adj_tile not in this_step and not
-                    adj_tile.occupied
+            if tile.type == 'elevated' and not elevated and not unit.can_climb: continue
+            # loop through the tile's adjoining tiles
+            adjoiners = game_map.adjoiner_tiles[tile.index]
+            for direction, adj_tile in enumerate(adjoiners):
+                if (adj_tile in tile_distance or
+                    adj_tile.type == 'edge' or
+                    adj_tile.type == 'wall' or
+                    (adj_tile.occupied and adj_tile.occupied != unit)
                 ):
-
-                    # if direction is cardinal n, s, e, w, it's valid;
-                    #   nw, se etc. are a 2-character string so won't pass
-                    if (len(direction) == 1 and adj_tile not in last_step):
-                        this_step.append(adj_tile)
-
-                    # if direction is diagonal, need to check the adjacent
-                    #   cardinals for walls (cannot pass a wall corner)
-                    else:
-                        # direction is a 2-character string, break it
-                        n_s = direction[0]
-                        e_w = direction[1]
-
-                        # determine distance from source
-                        ROUND_FACTOR = 1
-                        l = Line(home_tile.CEN, adj_tile.CEN)
-                        dist = l.length() / game_map.settings.tile_size + ROUND_FACTOR
-                        # print(dist)
-
-                        # if a valid step, add to the step list and the unit's master list
-                        if (tile.adjoiners[n_s].type != 'wall' and
-                            tile.adjoiners[e_w].type != 'wall' and
-                            adj_tile not in last_step and
-                            adj_tile not in this_step and
-                            dist <= unit.move_speed
-                        ):
-                            this_step.append(adj_tile)
-
-        # add all tiles in this step
-        unit.tile_steps.append(this_step)
+                    continue
+
+                # if direction is diagonal, need to check the adjacent
+                #   cardinals for walls (cannot pass a wall corner) and the
+                #   distance from home
+                if direction in DIAGONAL_SIDES:
+                    n_s, e_w = DIAGONAL_SIDES[direction]
+                    if (adjoiners[n_s].type == 'wall' or
+                        adjoiners[e_w].type == 'wall'
+                    ):
+                        continue
+                    d_row = adj_tile.row - home_tile.row
+                    d_col = adj_tile.col - home_tile.col
+                    if d_row**2 + d_col**2 > max_diagonal:
+                        continue
+
+                tile_distance[adj_tile] = step
+                this_step.append(adj_tile)
+
+        # add all tiles first reached on this step
+        tile_steps.append(this_step)
+
+    return tile_distance, tile_steps
 
 ################################################################################
 # LINE OF SIGHT PUBLIC FUNCTIONS
@@ -152,47 +200,269 @@ def determine_los(game_map, unit):
     """find any tiles visible to the unit"""
     # print(f"determining line-of-sight for row {unit.tile.row}, col {unit.tile.col}...")
 
-    # check each tile on the map
-    # visible_tiles is a dictionary;
-    #   keys are tiles and values are the first sight line found
-    unit.visible_tiles = {unit.tile: None}
-    for target_tile in game_map.all_tiles:
-        # if target_tile.type == 'wall':
-        #     continue
-        # determine if source has LOS to current tile
-        los, sight_line = line_of_sight(game_map, unit.tile, target_tile)
-        if los:
-            unit.visible_tiles[target_tile] = sight_line
+    # visible_tiles maps tiles to the first sight line found;
+    #   the geometry was all done by build_los_table() when the map loaded,
+    #   so this is just the source tile's row of the table
+    unit.visible_tiles = SightLines(game_map, unit.tile)
+
+
+class SightLines(Mapping):
+    """the tiles visible from one source tile; sight lines are only
+    rebuilt from the LOS table when somebody asks for one
+
+    this is a view of the map's LOS table rather than a copy, so every
+    unit's view stays right when the terrain changes (see
+    refresh_los_table)"""
+
+    def __init__(self, game_map, source):
+        self.game_map = game_map
+        self.source = source
+
+    @property
+    def visible(self):
+        if self.game_map.los_changes:
+            refresh_los_table(self.game_map)
+        return self.game_map.los_visible[self.source.index]
+
+    def __contains__(self, tile):
+        if tile is self.source: return True
+        index = getattr(tile, 'index', None)
+        if index is None or self.game_map.all_tiles[index] is not tile:
+            return False
+        return bool(self.visible >> index & 1)
+
+    def __getitem__(self, tile):
+        if tile not in self:
+            raise KeyError(tile)
+        if not self.visible >> tile.index & 1:
+            return None
+        row = self.source.index * len(self.game_map.all_tiles)
+        witness = self.game_map.los_witness[row + tile.index]
+        return _witness_line(self.source, tile, witness)
+
+    def __iter__(self):
+        # the source tile always comes first
+        yield self.source
+        visible = self.visible & ~(1 << self.source.index)
+        while visible:
+            low_bit = visible & -visible
+            visible ^= low_bit
+            yield self.game_map.all_tiles[low_bit.bit_length() - 1]
+
+    def __len__(self):
+        return bin(self.visible | 1 << self.source.index).count('1')
+
+
+def build_los_table(game_map):
+    """precompute line-of-sight between every pair of tiles on the map
+
+    game_map.los_visible is a list with one bitset per source tile; bit n is
+        set if the source can see game_map.all_tiles[n]
+    game_map.los_witness is a flat N*N bytearray holding the index of the
+        first good sight line for each (source, target) pair, or NO_LOS"""
+    tiles = game_map.all_tiles
+    n     = len(tiles)
+    game_map.los_visible = [0] * n
+    game_map.los_witness = bytearray([NO_LOS]) * (n * n)
+    # a full build takes in any terrain changes still waiting
+    game_map.los_changes = {}
+
+    wall_bits   = _wall_bits(game_map)
+    sight_masks = {}
+
+    for s, source in enumerate(tiles):
+        # units never stand on walls, so don't bother looking out of them
+        if source.type == 'wall': continue
+        for t, target in enumerate(tiles):
+            # pairs of open tiles were already done from the lower index
+            if t < s and target.type != 'wall': continue
+            _store_witness(game_map, s, t, _first_clear_witness(
+                game_map, source, target, wall_bits, sight_masks))
+
+            # the lines still need testing both ways since the slope math
+            #   isn't exactly symmetric when a line grazes a wall corner
+            if t == s or target.type == 'wall': continue
+            _store_witness(game_map, t, s, _first_clear_witness(
+                game_map, target, source, wall_bits, sight_masks))
+
+
+def refresh_los_table(game_map):
+    """bring the LOS table up to date after tiles have been turned into
+    walls or have stopped being walls; game_map.los_changes holds each such
+    tile and whether it was a wall when the table was last up to date
+
+    walls only ever block sight lines, so the only pairs of tiles worked
+    out again are those with a sight line that could touch a changed
+    tile's cell: a new wall can only spoil pairs that could see each other,
+    and a wall taken away can only open up a better line for pairs whose
+    first line was blocked. The pairs are worked out one offset at a time,
+    so each offset's sight masks are only drawn once"""
+    changed = [tile for tile, was_wall in game_map.los_changes.items()
+               if was_wall != (tile.type == 'wall')]
+    game_map.los_changes = {}
+    if not changed: return
+
+    tiles = game_map.all_tiles
+    n     = len(tiles)
+    changed_indices = {tile.index for tile in changed}
+
+    # the stale pairs, by the offset from source to target
+    stale = {}
+    for tile in changed:
+        wall_added = tile.type == 'wall'
+        for s, source in enumerate(tiles):
+            if source.type == 'wall' or s in changed_indices: continue
+            row = s * n
+            for target in _targets_past(game_map, source, tile):
+                if target is tile: continue
+                witness = game_map.los_witness[row + target.index]
+                # nothing to lose, or nothing better to find
+                if wall_added and witness == NO_LOS: continue
+                if not wall_added and witness == 0: continue
+                offset = (target.row - source.row, target.col - source.col)
+                stale.setdefault(offset, set()).add((s, target.index))
+
+    # the changed tiles' own rows; walls don't look out, so these are either
+    #   emptied or worked out from scratch. Their columns don't change: a
+    #   target never blocks the lines to itself, wall or not
+    for tile in changed:
+        _clear_row(game_map, tile.index)
+        if tile.type == 'wall': continue
+        for target in tiles:
+            offset = (target.row - tile.row, target.col - tile.col)
+            stale.setdefault(offset, set()).add((tile.index, target.index))
+
+    wall_bits = _wall_bits(game_map)
+    for pairs in stale.values():
+        # one offset's masks at a time, rather than every offset's at once
+        sight_masks = {}
+        for s, t in pairs:
+            game_map.los_visible[s] &= ~(1 << t)
+            game_map.los_witness[s * n + t] = NO_LOS
+            _store_witness(game_map, s, t, _first_clear_witness(
+                game_map, tiles[s], tiles[t], wall_bits, sight_masks))
 
 
 def line_of_sight(game_map, source, target, wide_fov = True):
     """return True if source tile has line-of-sight to target tile"""
-    los        = False
-    sight_line = None
-    test_lines = []
-
     if wide_fov:
-        # generate 25 lines: connect centers and all 4 corners
+        # test 25 lines connecting centers and all 4 corners in one batch
         # CHANGE THIS TO THE 5 POINTS ON FACE BUT ONLY IF TILES NOT ORDINAL
-        source_points = (source.CEN,
-            source.NW, source.NE, source.SW, source.SE)
-        target_points = (target.CEN,
-            target.NW, target.NE, target.SW, target.SE)
-
-    else:
-        # generate 1 line: center to center
-        source_points = [source.CEN]
-        target_points = [target.CEN]
+        witness = _first_clear_witness(
+            game_map, source, target, _wall_bits(game_map), {})
+        if witness is None:
+            return False, None
+        return True, _witness_line(source, target, witness)
 
-    # generate all possible lines from the 2 point groups
-    for source_point in source_points:
-        for target_point in target_points:
-            test_lines.append(Line(source_point, target_point))
+    # generate 1 line: center to center
+    test_lines = [Line(source.CEN, target.CEN)]
 
     # test all lines against all walls except target
-    for line in test_lines:
+    witness = _first_clear_line(game_map, test_lines, target)
+    if witness is None:
+        return False, None
+    return True, test_lines[witness]
+
+################################################################################
+# LINE OF SIGHT PROTECTED FUNCTIONS
+################################################################################
+
+# marks a (source, target) pair with no good sight line in game_map.los_witness
+NO_LOS = 255
+
+def _los_points(tile):
+    """the five points that sight lines are drawn from/to"""
+    return (tile.CEN, tile.NW, tile.NE, tile.SW, tile.SE)
+
+
+def _los_lines(source, target):
+    """generate all 25 possible lines between the 2 point groups; the
+    witness index of a line is its position in this list"""
+    test_lines = []
+    for source_point in _los_points(source):
+        for target_point in _los_points(target):
+            test_lines.append(Line(source_point, target_point))
+    return test_lines
+
+
+def _witness_line(source, target, witness):
+    """rebuild the sight line stored in the LOS table"""
+    return Line(_los_points(source)[witness // 5],
+                _los_points(target)[witness % 5])
+
+
+def _store_witness(game_map, s, t, witness):
+    """record in the LOS table whether tile s can see tile t"""
+    if witness is None: return
+    game_map.los_visible[s] |= 1 << t
+    game_map.los_witness[s * len(game_map.all_tiles) + t] = witness
+
+
+def _clear_row(game_map, s):
+    """forget everything tile s could see"""
+    n = len(game_map.all_tiles)
+    game_map.los_visible[s] = 0
+    game_map.los_witness[s * n:(s + 1) * n] = bytes([NO_LOS]) * n
+
+
+def _targets_past(game_map, source, cell):
+    """the tiles that some sight line from the source could reach by
+    touching the cell on the way
+
+    all 25 lines between two tiles lie inside the convex hull of their two
+    squares, so this is the targets whose hull touches the cell; in grid
+    units from the source's corner, that's whether the segment from
+    (0, 0) to the target's offset passes within one tile of the cell's
+    corner on both axes"""
+    SLACK = 1e-6
+    rows, cols = len(game_map.tiles), len(game_map.tiles[0])
+    x = cell.col - source.col
+    y = cell.row - source.row
+
+    # a hull can only reach a cell more than a tile past the source if
+    #   its target is at least nearly as far out
+    row_range = range(rows)
+    if   y >  1: row_range = range(cell.row - 1, rows)
+    elif y < -1: row_range = range(0, cell.row + 2)
+    col_range = range(cols)
+    if   x >  1: col_range = range(cell.col - 1, cols)
+    elif x < -1: col_range = range(0, cell.col + 2)
+
+    for row in row_range:
+        d_y = row - source.row
+        # the part of the segment within one tile of the cell's rows
+        if d_y == 0:
+            if abs(y) > 1 + SLACK: continue
+            y_first, y_last = 0.0, 1.0
+        else:
+            y_first = (y - 1 - SLACK) / d_y
+            y_last  = (y + 1 + SLACK) / d_y
+            if y_first > y_last: y_first, y_last = y_last, y_first
+            y_first = max(y_first, 0.0)
+            y_last  = min(y_last, 1.0)
+            if y_first > y_last: continue
+
+        for col in col_range:
+            d_x = col - source.col
+            if d_x == 0:
+                if abs(x) > 1 + SLACK: continue
+                first, last = y_first, y_last
+            else:
+                x_first = (x - 1 - SLACK) / d_x
+                x_last  = (x + 1 + SLACK) / d_x
+                if x_first > x_last: x_first, x_last = x_last, x_first
+                first = max(x_first, y_first)
+                last  = min(x_last, y_last)
+            if first <= last:
+                yield game_map.tiles[row][col]
+
+
+def _first_clear_line(game_map, test_lines, target):
+    """return the index of the first line not blocked by any wall (except
+    the target itself), or None if they are all blocked"""
+    for witness, line in enumerate(test_lines):
         line_is_good = True
-        for wall in game_map.all_walls:
+        for wall in _walls_along(game_map, line):
             if wall.CEN == target.CEN:
                 continue
             collide = _collide_line_tile(line, wall)
@@ -200,14 +470,183 @@ def line_of_sight(game_map, source, target, wide_fov = True):
                 line_is_good = False
                 break
         if line_is_good:
-            sight_line = line
-            los = True
-            break
-    return los, sight_line
+            return witness
+    return None
+
+
+def _first_clear_witness(game_map, source, target, wall_bits, sight_masks):
+    """batch version of _first_clear_line for the 25 lines of _los_lines()
+
+    each line is tested against every wall at once by ANDing its cell mask
+    with the map's wall bitset; only a line that merely grazes a wall corner
+    falls back on _collide_line_tile, so the result is exactly the same"""
+    bits, stride, pad = wall_bits
+    d_row = target.row - source.row
+    d_col = target.col - source.col
+
+    # line up the wall bitset with the masks, which are drawn from the
+    #   source tile's cell; then skip the target's own wall
+    walls = bits >> (source.col * stride + source.row)
+    if target.type == 'wall':
+        walls &= ~(1 << ((d_col + pad) * stride + d_row + pad))
+
+    masks = sight_masks.get((d_row, d_col))
+    if masks is None:
+        masks = _sight_masks(d_row, d_col, stride, pad)
+        sight_masks[(d_row, d_col)] = masks
+
+    for witness, (touched, crossed) in enumerate(masks):
+        hits = touched & walls
+        if not hits:
+            return witness
+        if crossed & hits:
+            continue
+
+        # every hit is a corner graze; settle them with the exact test
+        line = _witness_line(source, target, witness)
+        line_is_good = True
+        while hits:
+            low_bit = hits & -hits
+            hits ^= low_bit
+            col, row = divmod(low_bit.bit_length() - 1, stride)
+            wall = game_map.wall_grid[source.row + row - pad][source.col + col - pad]
+            if _collide_line_tile(line, wall):
+                line_is_good = False
+                break
+        if line_is_good:
+            return witness
+    return None
+
+
+def _wall_bits(game_map):
+    """pack game_map.wall_grid into one integer, with enough empty padding
+    around the map that a sight mask can be slid anywhere without wrapping
+
+    returns (bits, stride, pad): the bits run down each column in turn, so
+        cell (row, col) is bit (col + pad) * stride + row + pad"""
+    grid   = game_map.wall_grid
+    pad    = max(len(grid), len(grid[0])) + 1
+    stride = len(grid) + 2 * pad
+    bits   = 0
+    for wall in game_map.all_walls:
+        bits |= 1 << ((wall.col + pad) * stride + wall.row + pad)
+    return bits, stride, pad
+
+
+def _sight_masks(d_row, d_col, stride, pad):
+    """cell masks for the 25 lines from a tile to the tile d_row, d_col away,
+    in _los_lines() order and laid out like _wall_bits() around the source
+
+    each line gets a pair of masks: every cell it touches at all, and the
+    cells it crosses by more than a rounding error; axis-aligned lines are
+    tested exactly by _collide_line_tile, so for them the two are the same"""
+    MARGIN = 1e-6
+    corners = ((0.5, 0.5), (0, 0), (1, 0), (0, 1), (1, 1))
+    masks = []
+    for ax, ay in corners:
+        for bx, by in corners:
+            bx += d_col
+            by += d_row
+            touched = _column_mask(
+                _supercover_columns(ax, ay, bx, by), stride, pad)
+            if ax == bx or ay == by:
+                crossed = touched
+            else:
+                crossed = _column_mask(
+                    _supercover_columns(ax, ay, bx, by, -MARGIN), stride, pad)
+            masks.append((touched, crossed))
+    return masks
+
+
+def _column_mask(columns, stride, pad):
+    """pack the runs of cells from _supercover_columns() into a bitset"""
+    mask = 0
+    for col, first_row, last_row in columns:
+        run   = (1 << (last_row - first_row + 1)) - 1
+        mask |= run << ((col + pad) * stride + first_row + pad)
+    return mask
+
+
+def _walls_along(game_map, sight_line):
+    """yield the walls in every grid cell the sight line passes through or
+    grazes, starting from its A end
+
+    this only picks candidates; _collide_line_tile still has the final say"""
+    tile_size = game_map.settings.tile_size
+    origin    = tile_size // 2      # the map starts half a tile in
+    grid      = game_map.wall_grid
+
+    # the cells crossed only depend on where the line sits relative to the
+    #   grid cell of its A end, so walk each shape once and then slide it
+    #   to wherever it's needed
+    row = (sight_line.A.y - origin) // tile_size
+    col = (sight_line.A.x - origin) // tile_size
+    x_0 = origin + col * tile_size
+    y_0 = origin + row * tile_size
+    shape = (tile_size, sight_line.A.x - x_0, sight_line.A.y - y_0,
+                        sight_line.B.x - x_0, sight_line.B.y - y_0)
+    cells = _SUPERCOVER_CACHE.get(shape)
+    if cells is None:
+        cells = _supercover(*[p / tile_size for p in shape[1:]])
+        _SUPERCOVER_CACHE[shape] = cells
+
+    rows, cols = len(grid), len(grid[0])
+    for d_row, d_col in cells:
+        r = row + d_row
+        c = col + d_col
+        if 0 <= r < rows and 0 <= c < cols and grid[r][c]:
+            yield grid[r][c]
+
+
+# supercover cell lists for each line shape walked so far
+_SUPERCOVER_CACHE = {}
+
+def _supercover(ax, ay, bx, by):
+    """list the (row, col) cells touched by the segment from A to B, in the
+    order they are reached walking from A"""
+    cells = []
+    for col, first_row, last_row in _supercover_columns(ax, ay, bx, by):
+        rows = range(first_row, last_row + 1)
+        if by < ay: rows = reversed(rows)
+        for row in rows:
+            cells.append((row, col))
+    return tuple(cells)
+
+
+def _supercover_columns(ax, ay, bx, by, slack = 1e-9):
+    """list the cells touched by the segment from A to B as one run of rows
+    per column, (col, first_row, last_row), walking from A; in grid units
+    where cell (row, col) spans col <= x <= col+1, row <= y <= row+1
+
+    a little slack on the cell boundaries keeps this safe to reuse for the
+    same shape anywhere on the map; negative slack only keeps the cells the
+    segment goes well inside of"""
+    columns = []
+    if ax < bx: west, east = ax, bx
+    else:       west, east = bx, ax
+
+    cols = range(ceil(west - slack) - 1, floor(east + slack) + 1)
+    if bx < ax: cols = reversed(cols)
+    if ax != bx: slope = (by - ay) / (bx - ax)
+
+    for col in cols:
+        # find the part of the line inside this column
+        if ax == bx:
+            y_1, y_2 = ay, by
+        else:
+            x_1 = col - slack     if col - slack > west    else west
+            x_2 = col + 1 + slack if col + 1 + slack < east else east
+            if x_1 > x_2: continue
+            y_1 = ay + (x_1 - ax) * slope
+            y_2 = ay + (x_2 - ax) * slope
+        if y_1 > y_2: y_1, y_2 = y_2, y_1
+
+        first_row = ceil(y_1 - slack) - 1
+        last_row  = floor(y_2 + slack)
+        if first_row <= last_row:
+            columns.append((col, first_row, last_row))
+    return columns
 
-################################################################################
-# LINE OF SIGHT PROTECTED FUNCTION
-################################################################################
 
 def _collide_line_tile(sight_line, tile):
     """returns True if the sightline touches the tile"""
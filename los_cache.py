@@ -0,0 +1,109 @@
+# los_cache.py
+
+"""keeps each map's line-of-sight table on disk, so the geometry only has to
+be worked out the first time a map is played"""
+
+import os
+import mmap
+import json
+import struct
+import hashlib
+
+from lf_functions import build_los_table, refresh_los_table
+
+# bump this whenever the table layout or the LOS rules change
+CACHE_VERSION = 1
+
+# magic, version, number of tiles, map key
+HEADER = struct.Struct('<5sBH20s')
+MAGIC  = b'LFLOS'
+
+
+def load_los_table(game_map):
+    """fill in game_map.los_visible and game_map.los_witness, from the cache
+    if this map's terrain has been seen before; otherwise build and save"""
+    key  = map_key(game_map)
+    # anything else worked out from the terrain alone can be shared by key
+    game_map.terrain_key = key
+    path = _cache_path(game_map, key)
+
+    if not _read_cache(game_map, path, key):
+        build_los_table(game_map)
+        _write_cache(game_map, path, key)
+
+
+def save_los_table(game_map):
+    """bring an edited map's table up to date and save it under the new
+    terrain, so the first match on the map just loads it"""
+    refresh_los_table(game_map)
+    key = map_key(game_map)
+    _write_cache(game_map, _cache_path(game_map, key), key)
+
+
+def map_key(game_map):
+    """hash of everything the LOS table depends on; an edited map gets a new
+    key, so its old cache entry is simply never looked at again"""
+    return terrain_key(game_map.settings,
+                       [[tile.type for tile in row] for row in game_map.tiles])
+
+
+def terrain_key(settings, tile_types):
+    """map_key() from the rows of tile types in a map file, without
+    building the map"""
+    terrain = {'version'  : CACHE_VERSION,
+               'tile_size': settings.tile_size,
+               'tiles'    : tile_types}
+    return hashlib.sha1(json.dumps(terrain).encode()).digest()
+
+
+def _cache_path(game_map, key):
+    """where the table for the terrain with this key is kept"""
+    return os.path.join(game_map.settings.cache_folder, 'los',
+                        f'{key.hex()}.los')
+
+
+def _read_cache(game_map, path, key):
+    """memory-map a cached table; returns False if it's missing or stale"""
+    n = len(game_map.all_tiles)
+    row_bytes = (n + 7) // 8
+    size = HEADER.size + n * row_bytes + n * n
+    try:
+        with open(path, 'rb') as f:
+            # copy-on-write, so the table can still be edited in memory
+            cache = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    except (OSError, ValueError):
+        return False
+
+    if len(cache) != size or HEADER.unpack_from(cache) != (
+            MAGIC, CACHE_VERSION, n, key):
+        print(f'stale LOS cache {path}; rebuilding')
+        cache.close()
+        return False
+
+    # the visibility bitsets, then the witness bytes straight off the map
+    view = memoryview(cache)
+    offset = HEADER.size
+    game_map.los_visible = []
+    for s in range(n):
+        game_map.los_visible.append(int.from_bytes(
+            view[offset:offset + row_bytes], 'little'))
+        offset += row_bytes
+    game_map.los_witness = view[offset:offset + n * n]
+    return True
+
+
+def _write_cache(game_map, path, key):
+    """save the table; a cache that can't be written isn't worth a crash"""
+    n = len(game_map.all_tiles)
+    row_bytes = (n + 7) // 8
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, CACHE_VERSION, n, key))
+            for visible in game_map.los_visible:
+                f.write(visible.to_bytes(row_bytes, 'little'))
+            f.write(game_map.los_witness)
+        os.replace(temp_path, path)
+    except OSError as error:
+        print(f'could not save LOS cache {path}: {error}')
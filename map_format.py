@@ -0,0 +1,181 @@
+# map_format.py
+
+"""the compact binary map format (.lfm), and converters to and from the
+JSON map format (.txt)
+
+an .lfm file is, all little-endian:
+    HEADER      magic, version, rows, columns, number of units
+    TEAM        once per team: main color, alt color, black/white unit
+                color, score limit and the length of the team name
+    team names  utf-8, one after the other
+    terrain     one TERRAIN_TYPES code per tile, row by row
+    units       one UNIT entry per unit: team, UNIT_CLASSES code, row, column
+
+run it on its own to convert maps, e.g.
+    python map_format.py "maps/khe sanh.txt"            (writes the .lfm)
+    python map_format.py --to-json "maps/khe sanh.lfm"  (writes the .txt)"""
+
+import os
+import sys
+import json
+import struct
+
+
+# bump this whenever the layout changes
+MAP_VERSION = 1
+
+# magic, version, rows, columns, number of units
+HEADER = struct.Struct('<5sBBBH')
+MAGIC  = b'LFMAP'
+
+# main color, alt color, black (1) or white (0), score limit, name length
+TEAM = struct.Struct('<3B3BBHB')
+
+# team, unit class, row, column
+UNIT = struct.Struct('<4B')
+
+# a tile's type is its index in this tuple; only add to the end
+TERRAIN_TYPES = ('level', 'elevated', 'wall', 'base_u', 'base_1', 'base_2')
+UNIT_CLASSES  = ('basic', 'sniper', 'scout', 'grunt')
+TEAMS         = ('1', '2')
+
+JSON_EXTENSION   = '.txt'
+BINARY_EXTENSION = '.lfm'
+
+
+################################################################################
+# LOADING
+################################################################################
+
+def load_map(filename):
+    """read a map file of either format into the dictionary the JSON format
+    holds"""
+    if filename.endswith(BINARY_EXTENSION):
+        return read_lfm(filename)
+    with open(filename, 'r') as f:
+        return json.load(f)
+
+
+def read_lfm(filename):
+    """read an .lfm file into the same dictionary as the JSON format"""
+    with open(filename, 'rb') as f:
+        data = memoryview(f.read())
+
+    magic, version, rows, cols, unit_count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != MAP_VERSION:
+        raise ValueError(f'{filename} is not a version {MAP_VERSION} map')
+    offset = HEADER.size
+
+    map_dict = {'team_names': {}, 'team_color': {}, 'alt_team_color': {},
+                'b_w_team_color': {}, 'score_limit': {}}
+    name_lengths = []
+    for team in TEAMS:
+        (r, g, b, alt_r, alt_g, alt_b,
+         black, score_limit, name_length) = TEAM.unpack_from(data, offset)
+        offset += TEAM.size
+        map_dict['team_color'][team]     = [r, g, b]
+        map_dict['alt_team_color'][team] = [alt_r, alt_g, alt_b]
+        map_dict['b_w_team_color'][team] = 'black' if black else 'white'
+        map_dict['score_limit'][team]    = score_limit
+        name_lengths.append(name_length)
+    for team, name_length in zip(TEAMS, name_lengths):
+        map_dict['team_names'][team] = str(
+            data[offset:offset + name_length], 'utf-8')
+        offset += name_length
+
+    # the terrain codes index straight into TERRAIN_TYPES
+    map_dict['tiles'] = []
+    for r in range(rows):
+        row = data[offset:offset + cols]
+        map_dict['tiles'].append([TERRAIN_TYPES[code] for code in row])
+        offset += cols
+
+    map_dict['units'] = []
+    for team, unit_class, row, col in UNIT.iter_unpack(
+            data[offset:offset + unit_count * UNIT.size]):
+        map_dict['units'].append(
+            [TEAMS[team], UNIT_CLASSES[unit_class], row, col])
+    return map_dict
+
+
+def list_maps(folder = 'maps'):
+    """the map files in the folder, one per map name; if a map has been
+    saved in both formats, the .lfm file is the one listed"""
+    map_files = {}
+    for filename in sorted(os.listdir(folder)):
+        name, extension = os.path.splitext(filename)
+        if extension == BINARY_EXTENSION:
+            map_files[name] = filename
+        elif extension == JSON_EXTENSION:
+            map_files.setdefault(name, filename)
+    return [os.path.join(folder, filename) for filename in map_files.values()]
+
+
+
+################################################################################
+# SAVING
+################################################################################
+
+def write_lfm(map_dict, filename):
+    """write a map dictionary (as in the JSON format) to an .lfm file"""
+    tiles = map_dict['tiles']
+    units = map_dict['units']
+    data  = bytearray(HEADER.pack(MAGIC, MAP_VERSION, len(tiles),
+                                  len(tiles[0]), len(units)))
+    names = []
+    for team in TEAMS:
+        name = map_dict['team_names'][team].encode('utf-8')
+        names.append(name)
+        data += TEAM.pack(*map_dict['team_color'][team],
+                          *map_dict['alt_team_color'][team],
+                          map_dict['b_w_team_color'][team] == 'black',
+                          map_dict['score_limit'][team], len(name))
+    for name in names:
+        data += name
+    for row in tiles:
+        data += bytes(TERRAIN_TYPES.index(tile_type) for tile_type in row)
+    for team, unit_class, row, col in units:
+        data += UNIT.pack(TEAMS.index(team), UNIT_CLASSES.index(unit_class),
+                          row, col)
+
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+def write_json(map_dict, filename):
+    """write a map dictionary as a JSON map file"""
+    with open(filename, 'w') as f:
+        f.write(json.dumps(map_dict, indent=4))
+
+
+
+################################################################################
+# CONVERTERS
+################################################################################
+
+def json_to_lfm(filename, lfm_filename = None):
+    """convert a JSON map to .lfm, next to it unless told otherwise"""
+    if lfm_filename is None:
+        lfm_filename = os.path.splitext(filename)[0] + BINARY_EXTENSION
+    write_lfm(load_map(filename), lfm_filename)
+    return lfm_filename
+
+
+def lfm_to_json(filename, json_filename = None):
+    """convert an .lfm map to JSON, next to it unless told otherwise"""
+    if json_filename is None:
+        json_filename = os.path.splitext(filename)[0] + JSON_EXTENSION
+    write_json(read_lfm(filename), json_filename)
+    return json_filename
+
+
+
+if __name__ == '__main__':
+    to_json = '--to-json' in sys.argv[1:]
+    for filename in sys.argv[1:]:
+        if filename == '--to-json':
+            continue
+        if to_json:
+            print(f'{filename} -> {lfm_to_json(filename)}')
+        else:
+            print(f'{filename} -> {json_to_lfm(filename)}')
@@ -0,0 +1,319 @@
+# mcts_ai.py
+
+"""a computer player that picks its actions with Monte Carlo Tree Search
+
+an action is ('move', unit index, tile index), ('fire', unit index,
+target index) or ('end',) to end the turn; units are indexed by their
+place in game.roster and tiles by their place in game_map.all_tiles
+
+the search runs in a worker process (see AIPlayer) on its own copy of the
+match, so the game window stays responsive while the computer thinks. The
+dice and the snap shots that follow every move and shot are chance nodes:
+each pass through the tree rolls them again, and the tree branches on
+which shots hit"""
+
+import math
+import time
+import random
+from multiprocessing import Pipe, Process
+
+from lf_functions import CARDINALS, determine_range
+from game_state import (GameState, snapshot, restore, move_unit, fire,
+    begin_overwatch, resolve_overwatch, end_turn, check_victory, quietly)
+from self_play import play_turn, aggressive_policy
+
+
+# UCT exploration constant
+EXPLORATION = 1.0
+
+# walking destinations considered per unit at each decision
+CANDIDATE_MOVES = 4
+
+# after leaving the tree, play on this many turns before scoring the match
+ROLLOUT_TURNS = 2
+
+
+
+################################################################################
+# SEARCH TREE
+################################################################################
+
+class _Decision:
+    """a point where the active team picks an action"""
+    __slots__ = ('state', 'team', 'untried', 'children', 'visits')
+
+    def __init__(self, state, team, actions):
+        self.state    = state
+        self.team     = team
+        self.untried  = actions
+        self.children = {}      # action: _Chance
+        self.visits   = 0
+
+
+class _Chance:
+    """an action taken, waiting on the dice; children are keyed by which
+    shots hit"""
+    __slots__ = ('team', 'children', 'visits', 'value')
+
+    def __init__(self, team):
+        self.team     = team
+        self.children = {}      # outcome: _Decision
+        self.visits   = 0
+        self.value    = 0.0     # summed results for self.team
+
+
+class MCTS:
+    """searches from snapshots of a match on one map, for one team"""
+
+    def __init__(self, map_file, team, reuse_tree = True):
+        with quietly():
+            self.game = GameState(map_file)
+        # the search plays thousands of throwaway actions
+        self.game.log   = None
+        self.team       = team
+        self.reuse_tree = reuse_tree
+        self.root       = None
+        # every decision node by state, so a later search can start from
+        #   wherever the match has got to
+        self.nodes      = {}
+
+
+    def search(self, state, time_budget):
+        """the best action from the snapshot, after thinking for up to
+        time_budget seconds"""
+        deadline = time.perf_counter() + time_budget
+        self._set_root(state)
+        with quietly():
+            while time.perf_counter() < deadline:
+                self._iterate()
+                if len(self.root.children) == 1 and not self.root.untried:
+                    break
+        best = max(self.root.children.items(),
+                   key=lambda item: item[1].visits)
+        return best[0]
+
+
+    def _set_root(self, state):
+        """start from an old node for this state if there is one"""
+        root = self.nodes.get(state) if self.reuse_tree else None
+        if root is None:
+            with quietly():
+                restore(self.game, state)
+                root = self._new_decision(state)
+        self.root  = root
+        # forget everything that can't be reached any more
+        self.nodes = {}
+        nodes = [root]
+        while nodes:
+            node = nodes.pop()
+            self.nodes[node.state] = node
+            for chance in node.children.values():
+                nodes.extend(chance.children.values())
+
+
+    def _iterate(self):
+        """one pass: down the tree, add a node, play on at random, and
+        score the result back up the path"""
+        game = self.game
+        restore(game, self.root.state)
+        node = self.root
+        path = []
+        while not check_victory(game):
+            if node.untried:
+                action = node.untried.pop()
+                chance = node.children[action] = _Chance(node.team)
+            else:
+                action, chance = self._select(node)
+            path.append((node, chance))
+            outcome = self._apply(action)
+            child = chance.children.get(outcome)
+            if child is None:
+                state = snapshot(game)
+                child = self.nodes.get(state) or self._new_decision(state)
+                chance.children[outcome] = child
+                self.nodes[state] = child
+                break
+            node = child
+
+        result = self._rollout()
+        for node, chance in path:
+            node.visits   += 1
+            chance.visits += 1
+            if chance.team == self.team:
+                chance.value += result
+            else:
+                chance.value += 1 - result
+
+
+    def _select(self, node):
+        """the child with the best upper confidence bound"""
+        log_visits = math.log(node.visits)
+        best, best_bound = None, None
+        for action, chance in node.children.items():
+            bound = (chance.value / chance.visits + EXPLORATION *
+                     math.sqrt(log_visits / chance.visits))
+            if best_bound is None or bound > best_bound:
+                best, best_bound = (action, chance), bound
+        return best
+
+
+    def _new_decision(self, state):
+        """a decision node for the match as it stands"""
+        actions = self._actions()
+        random.shuffle(actions)
+        return _Decision(state, self.game.active_team, actions)
+
+
+
+    #####################################
+    # PLAYING ACTIONS
+    #####################################
+
+    def _actions(self):
+        """the actions worth considering for the active team"""
+        game = self.game
+        actions = [('end',)]
+        for unit in game.teams[game.active_team]:
+            if unit.current_ap <= 0:
+                continue
+            if unit.laser_charged:
+                for enemy in game.teams[game.inactive_team]:
+                    if enemy.tile in unit.visible_tiles:
+                        actions.append(('fire', unit.index, enemy.index))
+            if unit.can_move:
+                for tile in self._candidate_moves(unit):
+                    actions.append(('move', unit.index, tile.index))
+        return actions
+
+
+    def _candidate_moves(self, unit):
+        """the few best looking destinations in walking range: in view of
+        the enemy and in cover, or on the way to a base to recharge"""
+        game     = self.game
+        game_map = game.game_map
+        determine_range(game_map, unit)
+        enemies = [enemy.tile for enemy in game.teams[game.inactive_team]]
+        if unit.laser_uncharged:
+            goals = [tile for tile in game_map.bases[unit.team]
+                     if not tile.occupied]
+        else:
+            goals = enemies
+
+        def score(tile):
+            visible = game_map.los_visible[tile.index]
+            sees = sum(visible >> enemy.index & 1 for enemy in enemies)
+            cover = sum(adjoiner.type in ('wall', 'elevated') for adjoiner
+                        in game_map.adjoiner_tiles[tile.index][:len(CARDINALS)])
+            distance = min([max(abs(tile.row - goal.row),
+                                abs(tile.col - goal.col)) for goal in goals],
+                           default=0)
+            if unit.laser_uncharged:
+                return -distance
+            return 3*min(sees, 2) + cover - 0.1*distance
+
+        tiles = [tile for tile in unit.tile_distance
+                 if tile is not unit.tile and not tile.occupied]
+        tiles.sort(key=score, reverse=True)
+        return tiles[:CANDIDATE_MOVES]
+
+
+    def _apply(self, action):
+        """play the action, and the snap shots it draws; returns which of
+        the shots hit"""
+        game = self.game
+        if action[0] == 'end':
+            end_turn(game)
+            return ()
+
+        unit = game.roster[action[1]]
+        if action[0] == 'move':
+            move_unit(game, unit, game.game_map.all_tiles[action[2]])
+            outcome = []
+        else:
+            shot = fire(game, unit, game.roster[action[2]])
+            outcome = [shot['hit']]
+
+        if unit in game.teams[unit.team]:
+            begin_overwatch(game, unit)
+            for shot in resolve_overwatch(game, unit):
+                outcome.append((shot['shooter'].index, shot['hit']))
+        return tuple(outcome)
+
+
+    def _rollout(self):
+        """play on with a simple policy, then score the match for the team
+        between 0 (lost) and 1 (won)"""
+        game = self.game
+        last_turn = game.turn_number + ROLLOUT_TURNS
+        while not check_victory(game) and game.turn_number < last_turn:
+            play_turn(game, aggressive_policy)
+            if not check_victory(game):
+                end_turn(game)
+        return evaluate(game, self.team)
+
+
+
+def evaluate(game, team):
+    """how good the match looks for the team, from 0 to 1"""
+    victory = check_victory(game)
+    other = [other for other in game.teams if other != team][0]
+    if victory:
+        victory_type, winner, loser = victory
+        return 1.0 if winner == team or loser == other else 0.0
+
+    # points matter most, then lasers that still work, then units left
+    tracker = game.tracker
+    lead = (game.scores[team] - game.scores[other] +
+            0.5 * (tracker.lasers[team] - tracker.lasers[other]) +
+            0.5 * (tracker.units[team] - tracker.units[other]))
+    return 1 / (1 + math.exp(-lead / 2))
+
+
+
+################################################################################
+# WORKER PROCESS
+################################################################################
+
+class AIPlayer:
+    """runs an MCTS player for one team in a worker process; ask() for an
+    action, then poll() until it's ready"""
+
+    def __init__(self, map_file, team, reuse_tree = True):
+        self.team = team
+        self.connection, worker_connection = Pipe()
+        self.process = Process(target=_run_worker, daemon=True,
+            args=(worker_connection, map_file, team, reuse_tree))
+        self.process.start()
+
+
+    def ask(self, state, time_budget):
+        """start thinking about the snapshot"""
+        self.connection.send(('search', state, time_budget))
+
+
+    def poll(self):
+        """the action, if the worker has decided; otherwise None"""
+        if self.connection.poll():
+            return self.connection.recv()
+        return None
+
+
+    def close(self):
+        """stop the worker"""
+        try:
+            self.connection.send(('quit',))
+        except OSError:
+            pass
+        self.process.join(1)
+
+
+
+def _run_worker(connection, map_file, team, reuse_tree):
+    """the worker process: answer searches until told to quit"""
+    mcts = MCTS(map_file, team, reuse_tree)
+    while True:
+        message = connection.recv()
+        if message[0] == 'quit':
+            break
+        state, time_budget = message[1:]
+        connection.send(mcts.search(state, time_budget))
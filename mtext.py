@@ -1,4 +1,4 @@
-import pygame
+from assets import load_font, render_line
 
 
 class MText:
@@ -8,7 +8,8 @@ class MText:
         self.screen = lf_game.screen
         self.settings = lf_game.settings
         self.teams = self.settings.teams
-        self.font = pygame.font.SysFont(self.settings.font, font_size)
+        self.font_size = font_size
+        self.font = load_font(self.settings.font, font_size)
         self.color = text_color
         self.justify = justify
         self.line_space_factor = line_space_factor
@@ -23,7 +24,8 @@ class MText:
         self.line_images = []
 
         for i, line in enumerate(self.msg_lines):
-            line_image = self.font.render(line, True, self.color)
+            line_image = render_line(self.settings.font, self.font_size,
+                                     line, self.color)
             self.line_images.append(line_image)
             line_rect = line_image.get_rect()
 
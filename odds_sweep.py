@@ -0,0 +1,109 @@
+# odds_sweep.py
+
+"""works out the hit odds (see hit_odds.py) for every combination of a set
+of roll modifiers, and writes them all to one CSV file; one row per
+matchup per combination
+
+run it from the game folder, e.g.
+    python odds_sweep.py --dice 2D6 1D20 --base-to-hit 6 7 --tactical 1 2
+
+the modifiers are the ones the old roll charts were named after:
+    tactical   cover and elevation bonuses/maluses, and the overwatch penalty
+    grunt      the extra tactical modifier Grunts get on top of that
+    class      the Sniper to-hit bonus, and the Scout to-hit malus"""
+
+import csv
+import argparse
+from itertools import product
+from multiprocessing import Pool
+
+from settings import Settings
+from hit_odds import odds_table
+
+
+COLUMNS = ['dice', 'base_to_hit', 'tactical', 'grunt', 'class',
+           'zeroes', 'hundreds',
+           'shooter', 'target', 'shooter_elevated', 'target_elevated',
+           'target_in_cover', 'overwatch', 'needed', 'chance']
+
+
+def sweep_settings(dice, base_to_hit, tactical, grunt, class_modifier):
+    """Settings with one combination of the swept modifiers"""
+    settings = Settings()
+    settings.dice        = dice
+    settings.base_to_hit = base_to_hit
+
+    # lower rolls are better, so bonuses to the shooter are negative
+    settings.base_elevated_hit_bonus  = -tactical
+    settings.base_cover_defense_bonus = +tactical
+    settings.base_elev_defense_malus  = -tactical
+    settings.base_overwatch_penalty   = +tactical
+
+    settings.grunt_elevated_hit_bonus  = -grunt
+    settings.grunt_cover_defense_bonus = +grunt
+    settings.grunt_elev_defense_malus  = -grunt
+    settings.grunt_overwatch_penalty   = +grunt
+
+    settings.sniper_to_hit = -class_modifier
+    settings.scout_to_hit  = +class_modifier
+    return settings
+
+
+def sweep_rows(combination):
+    """the CSV rows for one combination of (dice, base_to_hit, tactical,
+    grunt, class_modifier)"""
+    dice = combination[0]
+    table = odds_table(sweep_settings(*combination))
+
+    chances  = [chance for needed, chance in table.values()]
+    zeroes   = chances.count(0)
+    hundreds = chances.count(1)
+
+    rows = []
+    for key, (needed, chance) in table.items():
+        rows.append([f'{dice[0]}D{dice[1]}', *combination[1:],
+                     zeroes, hundreds, *key, needed, f'{float(chance):.6f}'])
+    return rows
+
+
+def parse_dice(text):
+    """'2D6' -> (2, 6)"""
+    number, sides = text.upper().split('D')
+    return int(number), int(sides)
+
+
+
+def main():
+    defaults = Settings()
+    parser = argparse.ArgumentParser(
+        description='write the hit odds for a grid of roll modifiers to CSV')
+    parser.add_argument('-o', '--output', default='roll_charts/sweep.csv')
+    parser.add_argument('-d', '--dice', nargs='+', type=parse_dice,
+        default=[defaults.dice], help='dice specs like 2D6 or 1D20')
+    parser.add_argument('-b', '--base-to-hit', nargs='+', type=int,
+        default=[defaults.base_to_hit])
+    parser.add_argument('-t', '--tactical', nargs='+', type=int,
+        default=[defaults.base_cover_defense_bonus])
+    parser.add_argument('-g', '--grunt', nargs='+', type=int,
+        default=[defaults.grunt_cover_defense_bonus])
+    parser.add_argument('-c', '--class', nargs='+', type=int, dest='class_',
+        default=[defaults.scout_to_hit])
+    parser.add_argument('-w', '--workers', type=int, default=None,
+        help='worker processes (default: one per CPU)')
+    args = parser.parse_args()
+
+    combinations = list(product(args.dice, args.base_to_hit, args.tactical,
+                                args.grunt, args.class_))
+    with Pool(args.workers) as pool:
+        results = pool.map(sweep_rows, combinations)
+
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for rows in results:
+            writer.writerows(rows)
+    print(f'{len(combinations)} combinations written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
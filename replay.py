@@ -0,0 +1,171 @@
+# replay.py
+
+"""match logs: saving, loading and replaying them
+
+every GameState keeps its seed and an append-only log of what happened in
+the match (see record() in game_state.py). The entries are tuples, with
+units given by their index in game.roster and tiles by their index in
+game_map.all_tiles:
+    ('select', unit)
+    ('move', unit, tile)
+    ('fire', shooter, target, overwatch, dice, hit)
+    ('overwatch', target, shooters in the order they'll fire)
+    ('end',)
+
+the dice and the overwatch order all come from the match's seeded random
+stream, so the map, the seed and the player's decisions are enough to play
+a match again exactly; the rest of the log is there to check that it did
+
+run it on its own to replay a saved log, e.g.
+    python replay.py "logs/khe sanh 2024-05-01 201500.json"
+    python replay.py --watch "logs/khe sanh 2024-05-01 201500.json"
+"""
+
+import os
+import sys
+import json
+import time
+
+from game_state import (GameState, record, move_unit, fire, begin_overwatch,
+    resolve_overwatch, end_turn, quietly)
+
+
+# bump this whenever the entries change
+LOG_VERSION = 1
+
+
+
+################################################################################
+# SAVING AND LOADING
+################################################################################
+
+def save_log(game, filename):
+    """write the match's map, seed and log to a JSON file"""
+    log = {'version': LOG_VERSION,
+           'map':     game.map_file,
+           'seed':    game.seed,
+           'actions': game.log}
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(filename, 'w') as f:
+        # one entry per line, so logs diff well
+        f.write('{\n')
+        for key in ('version', 'map', 'seed'):
+            f.write(f'    {json.dumps(key)}: {json.dumps(log[key])},\n')
+        f.write('    "actions": [\n')
+        f.write(',\n'.join(f'        {json.dumps(entry)}'
+                           for entry in log['actions']))
+        f.write('\n    ]\n}\n')
+
+
+def load_log(filename):
+    """read a log saved by save_log(), with its entries as tuples again"""
+    with open(filename, 'r') as f:
+        log = json.load(f)
+    if log.get('version') != LOG_VERSION:
+        raise ValueError(f'{filename} is not a version {LOG_VERSION} log')
+    log['actions'] = log_from_json(log['actions'])
+    return log
+
+
+def log_from_json(entries):
+    """log entries read back from JSON, as tuples again"""
+    return [_as_tuple(entry) for entry in entries]
+
+
+def _as_tuple(value):
+    """JSON lists back to tuples, all the way down"""
+    if isinstance(value, list):
+        return tuple(_as_tuple(item) for item in value)
+    return value
+
+
+
+################################################################################
+# REPLAYING
+################################################################################
+
+def replay(log, settings = None):
+    """play the logged match again with no display, as fast as it goes;
+    returns the replayed GameState, whose own log should match"""
+    with quietly():
+        game = GameState(log['map'], settings, log['seed'])
+        for entry in log['actions']:
+            replay_entry(game, entry)
+    return game
+
+
+def replay_entry(game, entry):
+    """play one log entry; the overwatch order and the snap shots follow
+    from the move or shot before them, so they aren't played themselves"""
+    action = entry[0]
+    if action == 'select':
+        # no rules involved, but it keeps the logs the same
+        record(game, *entry)
+    elif action == 'move':
+        unit = game.roster[entry[1]]
+        move_unit(game, unit, game.game_map.all_tiles[entry[2]])
+        _overwatch(game, unit)
+    elif action == 'fire' and not entry[3]:
+        unit = game.roster[entry[1]]
+        fire(game, unit, game.roster[entry[2]])
+        _overwatch(game, unit)
+    elif action == 'end':
+        end_turn(game)
+
+
+def _overwatch(game, unit):
+    """the enemy's snap shots at the unit, if it's still in play"""
+    if unit in game.teams[unit.team]:
+        begin_overwatch(game, unit)
+        resolve_overwatch(game, unit)
+
+
+def first_difference(log, game):
+    """the index of the first entry where the replayed game's log differs
+    from the original, or None if they're the same"""
+    original, replayed = log['actions'], game.log
+    for i, (a, b) in enumerate(zip(original, replayed)):
+        if a != b:
+            return i
+    if len(original) != len(replayed):
+        return min(len(original), len(replayed))
+    return None
+
+
+
+################################################################################
+# WATCHING
+################################################################################
+
+def watch(log):
+    """replay the logged match in the game window; a keypress skips the
+    animations"""
+    # only needs pygame when there's something to watch
+    from laser_flag import LaserFlag
+    lf = LaserFlag(log['map'], seed=log['seed'], replay=log['actions'])
+    lf.run_game()
+
+
+
+if __name__ == '__main__':
+    filenames = [arg for arg in sys.argv[1:] if arg != '--watch']
+    for filename in filenames:
+        log = load_log(filename)
+        if '--watch' in sys.argv[1:]:
+            watch(log)
+            continue
+        start = time.perf_counter()
+        game = replay(log)
+        seconds = time.perf_counter() - start
+        difference = first_difference(log, game)
+        print(f"{filename}: {len(log['actions'])} entries in "
+              f"{seconds*1000:.1f} ms, turn {game.turn_number}, "
+              f"scores {game.scores}")
+        if difference is None:
+            print('    replayed exactly')
+        else:
+            print(f'    differs from entry {difference}: '
+                  f"{log['actions'][difference:difference + 1]} != "
+                  f'{game.log[difference:difference + 1]}')
@@ -5,6 +5,7 @@ import pygame
 from tile import Tile
 from units import BasicUnit, Sniper, Grunt, Scout
 from mtext import MText
+from assets import load_image
 
 
 class Rules():
@@ -95,15 +96,15 @@ class Rules():
 
 
     def _draw_misc_icons(self):
-        self.icon_el = pygame.image.load('images/unit_status_elevated.png')
-        self.icon_cv = pygame.image.load('images/unit_status_cover_n.png')
-        self.icon_ap_1 = pygame.image.load('images/unit_status_ap_1.png')
-        self.icon_ap_2 = pygame.image.load('images/unit_status_ap_2.png')
-        self.icon_mv = pygame.image.load('images/unit_status_move_y.png')
-        self.icon_nm = pygame.image.load('images/unit_status_move_n.png')
-        self.icon_sn = pygame.image.load('images/unit_status_ap_-3.png')
-        self.icon_un = pygame.image.load('images/unit_status_uncharged.png')
-        self.icon_ch = pygame.image.load('images/unit_status_charging.png')
+        self.icon_el = load_image('unit_status_elevated')
+        self.icon_cv = load_image('unit_status_cover_n')
+        self.icon_ap_1 = load_image('unit_status_ap_1')
+        self.icon_ap_2 = load_image('unit_status_ap_2')
+        self.icon_mv = load_image('unit_status_move_y')
+        self.icon_nm = load_image('unit_status_move_n')
+        self.icon_sn = load_image('unit_status_ap_-3')
+        self.icon_un = load_image('unit_status_uncharged')
+        self.icon_ch = load_image('unit_status_charging')
 
 
     def _draw_text(self):
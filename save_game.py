@@ -0,0 +1,185 @@
+# save_game.py
+
+"""saving a match in progress to a compact binary file (.lfs), and picking
+it up again
+
+a save holds a snapshot() of the match (see game_state.py) and everything
+else needed to carry on exactly where it left off: the team names, the
+state of the match's random stream, and its seed and log so it can still
+be replayed from the start. The map itself isn't saved; the save names the
+map file and the terrain key load_los_table() gave it, so resuming only
+has to load the map (and its cached LOS table) and put the units back
+
+a .lfs file is, all little-endian:
+    HEADER      magic, version, terrain key, turn number, active team,
+                score per team, number of units, length of the map file
+                name, lengths of the team names
+    map file    utf-8
+    team names  utf-8, one after the other
+    units       one UNIT entry per unit in game.roster
+    random      the Mersenne Twister state: RANDOM_STATE
+    log         zlib-compressed JSON of the seed and the log, to the end"""
+
+import os
+import json
+import zlib
+import math
+import struct
+
+from settings import Settings
+from game_state import snapshot, restore
+from los_cache import terrain_key
+from map_format import TEAMS, load_map
+from replay import log_from_json
+
+
+# bump this whenever the layout changes
+SAVE_VERSION = 1
+
+# magic, version, terrain key, turn, active team, scores, units,
+#   map file name length, team name lengths
+HEADER = struct.Struct('<5sB20sHB2HHH2B')
+MAGIC  = b'LFSAV'
+
+# tile index (ELIMINATED once the unit is out), AP (negative on
+#   overwatch), status flags
+UNIT = struct.Struct('<HbB')
+ELIMINATED = 0xFFFF
+
+# the status flags, in snapshot() order
+CAN_MOVE, LASER_CHARGED, LASER_UNCHARGED, LASER_CHARGING = 1, 2, 4, 8
+
+# the 624 words of state and the position in them, and the cached
+#   gaussian (NaN if there isn't one)
+RANDOM_STATE = struct.Struct('<625Id')
+
+SAVE_EXTENSION = '.lfs'
+
+
+
+################################################################################
+# SAVING
+################################################################################
+
+def save_game(game, filename):
+    """write the match, as it stands between actions, to an .lfs file"""
+    turn_number, active_team, scores, units = snapshot(game)
+    map_file = game.map_file.encode('utf-8')
+    names = [game.settings.team_names[team].encode('utf-8') for team in TEAMS]
+
+    data = bytearray(HEADER.pack(MAGIC, SAVE_VERSION,
+        game.game_map.terrain_key, turn_number, TEAMS.index(active_team),
+        *scores, len(units), len(map_file), *(len(name) for name in names)))
+    data += map_file
+    for name in names:
+        data += name
+
+    for unit_state in units:
+        if unit_state is None:
+            data += UNIT.pack(ELIMINATED, 0, 0)
+            continue
+        tile_index, ap, *status = unit_state
+        flags = 0
+        for flag, on in zip((CAN_MOVE, LASER_CHARGED, LASER_UNCHARGED,
+                             LASER_CHARGING), status):
+            if on:
+                flags |= flag
+        data += UNIT.pack(tile_index, ap, flags)
+
+    version, words, gauss = game.rng.getstate()
+    data += RANDOM_STATE.pack(*words, math.nan if gauss is None else gauss)
+
+    data += zlib.compress(json.dumps(
+        {'seed': game.seed, 'log': game.log or []}).encode('utf-8'))
+
+    folder = os.path.dirname(filename)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(filename, 'wb') as f:
+        f.write(data)
+
+
+
+################################################################################
+# LOADING
+################################################################################
+
+def load_game(filename):
+    """read an .lfs file into a dictionary for resume(): the map file, the
+    terrain key, the snapshot, the team names, the random state, the seed
+    and the log"""
+    with open(filename, 'rb') as f:
+        data = memoryview(f.read())
+    try:
+        return _unpack_save(filename, data)
+    except (struct.error, zlib.error, KeyError, IndexError) as error:
+        raise ValueError(f'{filename} is damaged ({error})')
+
+
+def _unpack_save(filename, data):
+    """the dictionary load_game() returns, from the file's bytes"""
+    (magic, version, terrain_key, turn_number, active_team, *rest
+     ) = HEADER.unpack_from(data)
+    if magic != MAGIC or version != SAVE_VERSION:
+        raise ValueError(f'{filename} is not a version {SAVE_VERSION} save')
+    scores = tuple(rest[:len(TEAMS)])
+    unit_count, map_length, *name_lengths = rest[len(TEAMS):]
+    offset = HEADER.size
+
+    map_file = str(data[offset:offset + map_length], 'utf-8')
+    offset += map_length
+    team_names = {}
+    for team, name_length in zip(TEAMS, name_lengths):
+        team_names[team] = str(data[offset:offset + name_length], 'utf-8')
+        offset += name_length
+
+    units = []
+    for tile_index, ap, flags in UNIT.iter_unpack(
+            data[offset:offset + unit_count * UNIT.size]):
+        if tile_index == ELIMINATED:
+            units.append(None)
+        else:
+            units.append((tile_index, ap, bool(flags & CAN_MOVE),
+                          bool(flags & LASER_CHARGED),
+                          bool(flags & LASER_UNCHARGED),
+                          bool(flags & LASER_CHARGING)))
+    offset += unit_count * UNIT.size
+
+    *words, gauss = RANDOM_STATE.unpack_from(data, offset)
+    offset += RANDOM_STATE.size
+    random_state = (3, tuple(words), None if math.isnan(gauss) else gauss)
+
+    history = json.loads(zlib.decompress(data[offset:]))
+    return {'map':          map_file,
+            'terrain_key':  bytes(terrain_key),
+            'state':        (turn_number, TEAMS[active_team], scores,
+                             tuple(units)),
+            'team_names':   team_names,
+            'random_state': random_state,
+            'seed':         history['seed'],
+            'log':          log_from_json(history['log'])}
+
+
+def check_map(saved, settings = None):
+    """raise ValueError if the saved match's map has been edited since, so
+    the match can be turned down before anything is loaded"""
+    tile_types = load_map(saved['map'])['tiles']
+    if terrain_key(settings or Settings(), tile_types) != saved['terrain_key']:
+        _map_edited(saved)
+
+
+def resume(game, saved):
+    """carry on a saved match in a game freshly loaded on the same map"""
+    if game.game_map.terrain_key != saved['terrain_key']:
+        _map_edited(saved)
+    restore(game, saved['state'])
+    game.settings.team_names.update(saved['team_names'])
+    game.rng.setstate(saved['random_state'])
+    game.seed = saved['seed']
+    game.log  = list(saved['log'])
+
+
+def _map_edited(saved):
+    """turn down a match whose map has changed"""
+    raise ValueError(f"{saved['map']} has been edited since the match was "
+                     "saved")
@@ -0,0 +1,385 @@
+# self_play.py
+
+"""plays Laser Flag matches between scripted policies with no display, to
+gather balance statistics for the maps and the roll modifiers in
+settings.py
+
+run it from the game folder, e.g.
+    python self_play.py -n 200 -p aggressive cautious "maps/khe sanh.txt"
+
+every game gets its own seed (worked out from --seed, the map and the game
+number), so a run gives the same results however many workers it uses"""
+
+import os
+import random
+import argparse
+from multiprocessing import Pool
+
+from settings import Settings
+from map_format import list_maps
+from lf_functions import CARDINALS
+from utility_ai import utility_policy
+from game_state import (GameState, calc_to_hit, move_unit, fire,
+    begin_overwatch, resolve_overwatch, end_turn, check_victory, quietly)
+
+
+# a match that hasn't ended after this many turns (one team's moves each)
+#   is scored as a draw
+MAX_TURNS = 100
+
+
+
+################################################################################
+# POLICIES
+#   a policy picks one action at a time for a unit on the active team:
+#   ('fire', target), ('move', tile) or None to leave the unit's remaining
+#   AP for overwatch
+################################################################################
+
+def random_policy(game, unit):
+    """fire at or move anywhere at random"""
+    targets = _visible_enemies(game, unit)
+    if targets and unit.laser_charged and random.random() < 0.5:
+        return 'fire', random.choice(targets)
+    if unit.can_move:
+        options = [tile for tile in unit.tile_distance if tile is not unit.tile]
+        if options:
+            return 'move', random.choice(options)
+    return None
+
+
+def aggressive_policy(game, unit):
+    """take the best shot going, otherwise close in on the enemy"""
+    if unit.laser_charged:
+        target = _best_target(game, unit)
+        if target:
+            return 'fire', target
+    if not unit.can_move:
+        return None
+    if unit.laser_uncharged:
+        return _move_toward(unit, _open_bases(game, unit))
+
+    # get a shot at someone, as close as possible
+    enemies = [enemy.tile for enemy in game.teams[game.inactive_team]]
+    los_visible = game.game_map.los_visible
+    def score(tile):
+        sees = sum(los_visible[tile.index] >> enemy.index & 1
+                   for enemy in enemies)
+        return 10*sees - _distance(tile, enemies)
+    return _move_to_best(unit, score)
+
+
+def cautious_policy(game, unit):
+    """only take good shots; otherwise find cover with a view and keep the
+    rest of the AP for overwatch"""
+    if unit.laser_charged:
+        target = _best_target(game, unit, settle_for=game.settings.base_to_hit)
+        if target:
+            return 'fire', target
+    if not unit.can_move:
+        return None
+    if unit.laser_uncharged:
+        return _move_toward(unit, _open_bases(game, unit))
+    # one move per turn, then wait
+    if unit.current_ap < unit.max_ap:
+        return None
+
+    enemies = [enemy.tile for enemy in game.teams[game.inactive_team]]
+    los_visible = game.game_map.los_visible
+    adjoiner_tiles = game.game_map.adjoiner_tiles
+    def score(tile):
+        sees = sum(los_visible[tile.index] >> enemy.index & 1
+                   for enemy in enemies)
+        # the cardinals come first in the adjoiners
+        cover = sum(adjoiner.type in ('wall', 'elevated')
+                    for adjoiner in adjoiner_tiles[tile.index][:len(CARDINALS)])
+        return 5*min(sees, 1) + 2*cover - sees
+    return _move_to_best(unit, score)
+
+
+POLICIES = {'random':     random_policy,
+            'aggressive': aggressive_policy,
+            'cautious':   cautious_policy,
+            'utility':    utility_policy}
+
+
+
+#####################################
+# POLICY HELPER FUNCTIONS
+#####################################
+
+def _visible_enemies(game, unit):
+    """the enemy units the unit could shoot at"""
+    return [enemy for enemy in game.teams[game.inactive_team]
+            if enemy.tile in unit.visible_tiles]
+
+
+def _best_target(game, unit, settle_for = None):
+    """the visible enemy that's easiest to hit, or None if there are none
+    (or if none can be hit with settle_for or lower)"""
+    best = None
+    best_total = None
+    for enemy in _visible_enemies(game, unit):
+        total = calc_to_hit(game.settings, unit, enemy)['total']
+        if best_total is None or total < best_total:
+            best, best_total = enemy, total
+    if settle_for is not None and best_total is not None and (
+            best_total > settle_for):
+        return None
+    return best
+
+
+def _open_bases(game, unit):
+    """the bases the unit could recharge on"""
+    return [tile for tile in game.game_map.bases[unit.team]
+            if not tile.occupied or tile.occupied is unit]
+
+
+def _distance(tile, others):
+    """grid distance to the closest of the other tiles"""
+    if not others:
+        return 0
+    return min(max(abs(tile.row - other.row), abs(tile.col - other.col))
+               for other in others)
+
+
+def _move_toward(unit, tiles):
+    """step as close as possible to the closest of the tiles"""
+    if not tiles:
+        return None
+    return _move_to_best(unit, lambda tile: -_distance(tile, tiles))
+
+
+def _move_to_best(unit, score):
+    """move to the best scoring tile in walking range; random tie-breaks,
+    and staying put if nothing beats the current tile"""
+    best_tiles = [unit.tile]
+    best_score = score(unit.tile)
+    for tile in unit.tile_distance:
+        if tile.occupied:
+            continue
+        tile_score = score(tile)
+        if tile_score > best_score:
+            best_tiles, best_score = [tile], tile_score
+        elif tile_score == best_score:
+            best_tiles.append(tile)
+    tile = random.choice(best_tiles)
+    if tile is unit.tile:
+        return None
+    return 'move', tile
+
+
+
+################################################################################
+# PLAYING GAMES
+################################################################################
+
+def game_seed(seed, map_file, game_number):
+    """the seed for one game; the same whichever worker plays it"""
+    name = os.path.splitext(os.path.basename(map_file))[0]
+    return f'{seed}:{name}:{game_number}'
+
+
+def play_game(map_file, policies, seed, max_turns = MAX_TURNS):
+    """play one match; policies maps each team to a policy name
+
+    returns a dict with the winning team (None for a draw), the victory
+    type, the number of turns, and the shots and hits by unit class"""
+    random.seed(seed)
+    with quietly():
+        game = GameState(map_file, Settings(), seed)
+        result = {'map':      map_file,
+                  'seed':     seed,
+                  'policies': dict(policies),
+                  'shots':    {},
+                  'hits':     {}}
+
+        victory = check_victory(game)
+        while not victory and game.turn_number <= max_turns:
+            play_turn(game, POLICIES[policies[game.active_team]], result)
+            victory = check_victory(game)
+            if not victory:
+                end_turn(game)
+
+    # a draw has ended its last turn too, which moved turn_number past it
+    result['turns'] = game.turn_number if victory else game.turn_number - 1
+    if victory:
+        victory_type, winner, loser = victory
+        if winner is None:
+            winner = [team for team in game.teams if team != loser][0]
+        result['victory'] = victory_type
+        result['winner']  = winner
+    else:
+        result['victory'] = 'draw'
+        result['winner']  = None
+    return result
+
+
+def play_turn(game, policy, result = None):
+    """let the active team's units act, one at a time, as the policy says;
+    shots are counted in result if there is one"""
+    for unit in list(game.teams[game.active_team]):
+        # every action costs at least one AP
+        for _ in range(unit.max_ap):
+            if unit not in game.teams[unit.team] or unit.current_ap <= 0:
+                break
+            action = policy(game, unit)
+            if action is None:
+                break
+            if action[0] == 'fire':
+                _record_shot(result, unit, fire(game, unit, action[1]))
+            elif not move_unit(game, unit, action[1]):
+                break
+
+            # the enemy's snap shots, if the unit is still in play
+            if unit in game.teams[unit.team]:
+                begin_overwatch(game, unit)
+                for shot in resolve_overwatch(game, unit):
+                    shooter = shot['shooter']
+                    _record_shot(result, shooter, shot)
+            if check_victory(game):
+                return
+
+
+def _record_shot(result, shooter, shot):
+    """count the shot, and the hit, against the shooter's class"""
+    if result is None:
+        return
+    unit_class = shooter.unit_class
+    result['shots'][unit_class] = result['shots'].get(unit_class, 0) + 1
+    if shot['hit']:
+        result['hits'][unit_class] = result['hits'].get(unit_class, 0) + 1
+
+
+def _play_task(task):
+    """unpack a game for the worker pool"""
+    return play_game(*task)
+
+
+
+################################################################################
+# STATISTICS
+################################################################################
+
+def new_summary():
+    """empty totals for summarize() to fill in"""
+    return {'games': 0, 'wins': {}, 'wins_by_policy': {}, 'victories': {},
+            'turns': [], 'shots': {}, 'hits': {}}
+
+
+def summarize(summary, result):
+    """add one game's result to the totals"""
+    summary['games'] += 1
+    winner = result['winner']
+    if winner is not None:
+        summary['wins'][winner] = summary['wins'].get(winner, 0) + 1
+        policy = result['policies'][winner]
+        summary['wins_by_policy'][policy] = (
+            summary['wins_by_policy'].get(policy, 0) + 1)
+    victory = result['victory']
+    summary['victories'][victory] = summary['victories'].get(victory, 0) + 1
+    summary['turns'].append(result['turns'])
+    for unit_class, shots in result['shots'].items():
+        summary['shots'][unit_class] = (
+            summary['shots'].get(unit_class, 0) + shots)
+    for unit_class, hits in result['hits'].items():
+        summary['hits'][unit_class] = summary['hits'].get(unit_class, 0) + hits
+    return summary
+
+
+def print_summary(title, summary, teams):
+    """print the totals for one map (or for the whole run)"""
+    games = summary['games']
+    if not games:
+        return
+    print(title)
+    for team in teams:
+        wins = summary['wins'].get(team, 0)
+        print(f'    team {team} wins:  {wins:5} ({100 * wins / games:5.1f}%)')
+    for policy, wins in sorted(summary['wins_by_policy'].items()):
+        print(f'    {policy} wins: {wins:5} ({100 * wins / games:5.1f}%)')
+    for victory, count in sorted(summary['victories'].items()):
+        print(f'    {victory:12} {count:5} ({100 * count / games:5.1f}%)')
+    turns = sorted(summary['turns'])
+    print(f'    turns: mean {sum(turns) / games:.1f}, '
+          f'median {turns[games // 2]}, range {turns[0]}-{turns[-1]}')
+    for unit_class, shots in sorted(summary['shots'].items()):
+        hits = summary['hits'].get(unit_class, 0)
+        print(f'    {unit_class:7} {hits:5} hits / {shots:5} shots '
+              f'({100 * hits / shots:5.1f}%)')
+    print()
+
+
+
+################################################################################
+# COMMAND LINE
+################################################################################
+
+def run_batch(map_files, games, policies, seed = 0, workers = None,
+              max_turns = MAX_TURNS, swap_sides = True):
+    """play games on every map across a pool of worker processes; returns
+    the results in the order they were asked for
+
+    with swap_sides, the policies change sides every other game so each
+    one gets to move first equally often"""
+    teams = Settings().teams
+    tasks = []
+    for map_file in map_files:
+        for game_number in range(games):
+            first, second = policies
+            if swap_sides and game_number % 2:
+                first, second = second, first
+            tasks.append((map_file, {teams[0]: first, teams[1]: second},
+                          game_seed(seed, map_file, game_number), max_turns))
+
+    # load each map once up front, so the workers find its LOS table
+    #   already cached instead of all building (and saving) it at once
+    with quietly():
+        for map_file in map_files:
+            GameState(map_file, Settings())
+
+    with Pool(workers) as pool:
+        return pool.map(_play_task, tasks, chunksize=max(1, games // 8))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='play Laser Flag matches between scripted policies')
+    parser.add_argument('maps', nargs='*',
+        help="map files to play (default: everything in maps/ that doesn't "
+             "start with '_')")
+    parser.add_argument('-n', '--games', type=int, default=100,
+        help='games per map')
+    parser.add_argument('-p', '--policies', nargs=2, default=['random', 'random'],
+        choices=sorted(POLICIES), metavar='POLICY',
+        help=f"the two policies to play ({', '.join(sorted(POLICIES))})")
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    parser.add_argument('-w', '--workers', type=int, default=None,
+        help='worker processes (default: one per CPU)')
+    parser.add_argument('--max-turns', type=int, default=MAX_TURNS,
+        help='turns before a game counts as a draw')
+    parser.add_argument('--fixed-sides', action='store_true',
+        help='keep the first policy on team 1 instead of alternating')
+    args = parser.parse_args()
+
+    map_files = args.maps or [map_file for map_file in list_maps('maps')
+                              if not os.path.basename(map_file).startswith('_')]
+
+    results = run_batch(map_files, args.games, args.policies, args.seed,
+                        args.workers, args.max_turns, not args.fixed_sides)
+
+    teams = Settings().teams
+    overall = new_summary()
+    for map_file in map_files:
+        summary = new_summary()
+        for result in results:
+            if result['map'] == map_file:
+                summarize(summary, result)
+                summarize(overall, result)
+        print_summary(map_file, summary, teams)
+    if len(map_files) > 1:
+        print_summary('all maps', overall, teams)
+
+
+if __name__ == '__main__':
+    main()
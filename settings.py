@@ -17,6 +17,16 @@ class Settings:
 
         self.tileset    = 'original'
 
+        # precomputed map data (line-of-sight tables) is saved here
+        self.cache_folder = 'cache'
+
+        # the log of every match played is saved here when the game closes;
+        #   see replay.py
+        self.log_folder   = 'logs'
+
+        # matches saved with the S key go here; see save_game.py
+        self.save_folder  = 'saves'
+
         # screen settings
         #   button frame is 9 tiles wide, plus 0.5 tile buffer
         #   at edges and between map and button frame
@@ -35,6 +45,10 @@ class Settings:
 
 
 
+        # dice rolled to hit, as (number of dice, sides per die); hit_odds.py
+        #   works out the chance of each roll
+        self.dice = (2, 6)
+
         # default unit settings
         self.base_max_ap              = +3
         self.base_move_speed          = +4  # higher value -> faster mover
@@ -63,9 +77,30 @@ class Settings:
         self.grunt_max_overwatch       =    +1    # a bonus
 
 
+        # computer players think for up to ai_think_time seconds per action
+        #   and ai_turn_time seconds per turn, and pick up where they left
+        #   off between actions if ai_reuse_tree is set
+        self.ai_think_time = 2.0
+        self.ai_turn_time  = 20.0
+        self.ai_reuse_tree = True
+
+
         # how many milliseconds between animation frames
         self.animation_speed = 50
 
+        # how many milliseconds a replay shows each action and roll result
+        #   for (a keypress skips them)
+        self.replay_pause    = 600
+
+        # the main loop sleeps until something happens, waking up at least
+        #   this often (ms); it only runs at fps while animating
+        self.idle_timeout = 1000
+        self.fps          = 60
+
+        # slowly slide the background lasers sideways, in pixels per second;
+        #   0 keeps them still (and the main loop asleep)
+        self.background_scroll = 0
+
         # width of the middle line of the laser
         #   (widest line with be this * 5)
         self.laser_width = 3
@@ -0,0 +1,75 @@
+# test_replay.py
+
+"""watching a logged match again in the game window"""
+
+import os
+import sys
+import random
+from io import StringIO
+from contextlib import redirect_stdout
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+from game_state import GameState, end_turn, check_victory, quietly
+from self_play import POLICIES, play_turn
+
+
+# an aggressive sniper on khe sanh fires twice running at the same target
+#   after missing, at entry 48
+MAP_FILE = 'maps/khe sanh.txt'
+SEED     = 'x:0'
+MAX_TURNS = 30
+
+
+def _play_match():
+    """the log of a self-play match between two aggressive teams"""
+    random.seed(SEED)
+    with quietly():
+        game = GameState(MAP_FILE, seed=SEED)
+        while not check_victory(game) and game.turn_number <= MAX_TURNS:
+            play_turn(game, POLICIES['aggressive'])
+            if not check_victory(game):
+                end_turn(game)
+    return game.log
+
+
+def _repeated_shots(log):
+    """indices of shots fired straight after the same shooter's last shot
+    at the same target, with nothing else played in between"""
+    played = [(i, entry) for i, entry in enumerate(log)
+              if entry[0] in ('move', 'end') or
+              (entry[0] == 'fire' and not entry[3])]
+    return [i for (_, last), (i, entry) in zip(played, played[1:])
+            if entry[0] == 'fire' and last[:3] == entry[:3]]
+
+
+def _without_selections(log):
+    return [entry for entry in log if entry[0] != 'select']
+
+
+def test_watch_replays_repeated_shots(monkeypatch):
+    monkeypatch.chdir(REPO)
+    log = _play_match()
+    assert _repeated_shots(log)
+
+    from laser_flag import LaserFlag
+    with redirect_stdout(StringIO()) as output:
+        lf = LaserFlag(MAP_FILE, seed=SEED, replay=log)
+        lf.replay_fast = True
+        # the main loop, without the waiting; the snap shots are fired
+        #   as soon as they're due rather than on OVERWATCH_EVENT
+        for _ in range(100000):
+            if not (lf.replay or lf.firing_laser or lf.show_roll_result or
+                    lf.overwatch_mode):
+                break
+            if lf.firing_laser:
+                lf._animate_laser()
+            elif lf.overwatch_mode and not lf.show_roll_result:
+                lf._next_overwatch()
+            lf._run_replay()
+
+    assert 'out of step' not in output.getvalue()
+    assert _without_selections(lf.log) == _without_selections(log)
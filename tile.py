@@ -3,72 +3,32 @@
 import pygame
 from pygame.sprite import Sprite
 
-from random import choice
+import random
 
-from lf_functions import Point, CARDINALS, INTERCARDINALS
+from lf_functions import CARDINALS
+from game_state import TileState
+from assets import load_image, rotated_image
 
-class Tile(Sprite):
-    """a class to define one map tile"""
+
+class Tile(TileState, Sprite):
+    """a class to define one map tile; the rules are in TileState"""
 
     def __init__(self, game_map, tile_data):
         """create one map tile"""
-        super().__init__()
-
-        # get dictionary data obtained by _read_map
-        #   the game_map uses an empty 'edge' tile to place in the 'adjoiners'
-        #   dictionary where appropriate
-        self.type = tile_data['type']
-        if self.type == 'edge':
-            self.row      = None
-            self.col      = None
-            self.occupied = None
-            return
-            # do not go any farther if this is an edge tile
+        super().__init__(game_map, tile_data)
 
         self.screen = game_map.screen
-        self.settings = game_map.settings
-
-        self.tilefolder = f'images/tilesets/{self.settings.tileset}'
-
-        self.ID = tile_data['ID']
 
-        self.row      = tile_data['row']
-        self.col      = tile_data['col']
-        self.occupied = tile_data['occupied']
+        self.tileset = self.settings.tileset
 
         # create the tile and position it
         tile_size   = self.settings.tile_size
-        half_tile   = tile_size // 2
-        self.rect   = pygame.Rect(0, 0, tile_size,
-                                        tile_size)
-        self.rect.x = (self.col * tile_size) + (tile_size // 2)
-        self.rect.y = (self.row * tile_size) + (tile_size // 2)
-
-        # corner coordinates
-        self.NW  = Point(self.rect.x,             self.rect.y)
-        self.N   = Point(self.rect.x + half_tile, self.rect.y)
-        self.NE  = Point(self.rect.x + tile_size, self.rect.y)
-        self.W   = Point(self.rect.x,             self.rect.y + half_tile)
-        self.CEN = Point(self.rect.x + half_tile, self.rect.y + half_tile)
-        self.E   = Point(self.rect.x + tile_size, self.rect.y + half_tile)
-        self.SW  = Point(self.rect.x,             self.rect.y + tile_size)
-        self.S   = Point(self.rect.x + half_tile, self.rect.y + tile_size)
-        self.SE  = Point(self.rect.x + tile_size, self.rect.y + tile_size)
-
-        # CREATE DICTIONARIES FOR EACH FACE (8 TOTAL)
-
-        # display flags
-        self.hilited = None
-        self.marks   = 0
-
-        # initialize dictionary to store adjoining tiles; actual adjoiners are
-        #   determined by game_map
-        edge_tile = Tile(game_map, {'type': 'edge'})
-        directions = {**CARDINALS, **INTERCARDINALS}
-        self.adjoiners = {}
-
-        for direction in directions:
-            self.adjoiners[direction]  = edge_tile
+        self.rect   = pygame.Rect(self.x, self.y, tile_size, tile_size)
+
+        # display flags; set through the hilited & marks properties so the
+        #   game_map knows which tiles need redrawing on its map layer
+        self._hilited = None
+        self._marks   = 0
 
         self.wallcap_images = {}
         self.show_wallcaps  = {'n': False, 's': False, 'e': False, 'w': False}
@@ -77,29 +37,53 @@ class Tile(Sprite):
         self.hilited_image = {}
         colors = ['b', 'y', 'r']
         for color in colors:
-            self.hilited_image[color] = pygame.image.load(
-                f"{self.tilefolder}/tile_hilite_{color}.png")
-
-        self.mark_image = pygame.image.load(f"{self.tilefolder}/tile_mark_los.png")
-        self.grid_lines = pygame.image.load(f"{self.tilefolder}/tile_grid.png")
+            self.hilited_image[color] = load_image(
+                f"tile_hilite_{color}", self.tileset)
 
-
-        # randomly rotate floor tiles
-        if self.type == 'level':
-            angles = [0, 90, 180, 270]
-            rotation = choice(angles)
-            self.image = pygame.transform.rotate(self.image, rotation)
+        self.mark_image = load_image("tile_mark_los", self.tileset)
+        self.grid_lines = load_image("tile_grid", self.tileset)
 
 
 
     def load_image(self):
         """load images; all 3 bases use 1 image"""
         if 'base' in self.type:
-            self.image = pygame.image.load(f"{self.tilefolder}/tile_base.png")
+            self.image = load_image("tile_base", self.tileset)
+        elif self.type == 'level':
+            # randomly rotate floor tiles; the map's tile_rng gives a
+            #   replayed match the same floor as the original
+            angles = [0, 90, 180, 270]
+            rng = getattr(self.game_map, 'tile_rng', random)
+            rotation = rng.choice(angles)
+            self.image = rotated_image("tile_level", self.tileset, rotation)
         else:
-            self.image = pygame.image.load(f"{self.tilefolder}/tile_{self.type}.png")
+            self.image = load_image(f"tile_{self.type}", self.tileset)
         for c in CARDINALS:
-            self.wallcap_images[c] = pygame.image.load(f"{self.tilefolder}/tile_wallcap_{c}.png")
+            self.wallcap_images[c] = load_image(f"tile_wallcap_{c}", self.tileset)
+
+
+
+    @property
+    def hilited(self):
+        """color of the range highlight, or None"""
+        return self._hilited
+
+    @hilited.setter
+    def hilited(self, color):
+        if color != self._hilited:
+            self._hilited = color
+            self.game_map.dirty_tiles.add(self)
+
+    @property
+    def marks(self):
+        """number of LOS marks on the tile"""
+        return self._marks
+
+    @marks.setter
+    def marks(self, marks):
+        if marks != self._marks:
+            self._marks = marks
+            self.game_map.dirty_tiles.add(self)
 
 
 
@@ -115,60 +99,73 @@ class Tile(Sprite):
 
     def change_type(self, new_type):
         """for use by the Map Editor"""
-        self.type = new_type
+        super().change_type(new_type)
         self.load_image()
+        self.game_map.dirty_tiles.add(self)
 
 
 
     def blitme(self):
         """draw the tile"""
+        self.draw_terrain(self.screen, self.rect)
+        self.draw_overlays(self.screen, self.rect)
+
+
+
+    def draw_terrain(self, surface, rect):
+        """draw the parts of the tile that only change with its type: the
+        base colors, the tile image, grid lines and wall caps"""
 
         if 'base' in self.type:
 
             if '_u' in self.type:
                 t = self.settings.tile_size // 2
-                pygame.draw.rect(self.screen,
+                pygame.draw.rect(surface,
                     self.settings.alt_team_color[self.settings.teams[0]],
-                    pygame.Rect(self.rect.x, self.rect.y, t, t))
-                pygame.draw.rect(self.screen,
+                    pygame.Rect(rect.x, rect.y, t, t))
+                pygame.draw.rect(surface,
                     self.settings.alt_team_color[self.settings.teams[1]],
-                    pygame.Rect(self.rect.x, self.rect.y+t, t, t))
-                pygame.draw.rect(self.screen,
+                    pygame.Rect(rect.x, rect.y+t, t, t))
+                pygame.draw.rect(surface,
                     self.settings.team_color[self.settings.teams[1]],
-                    pygame.Rect(self.rect.x+t, self.rect.y, t, t))
-                pygame.draw.rect(self.screen,
+                    pygame.Rect(rect.x+t, rect.y, t, t))
+                pygame.draw.rect(surface,
                     self.settings.team_color[self.settings.teams[0]],
-                    pygame.Rect(self.rect.x+t, self.rect.y+t, t, t))
-                pygame.draw.circle(self.screen, 'gray', self.rect.center, 10)
+                    pygame.Rect(rect.x+t, rect.y+t, t, t))
+                pygame.draw.circle(surface, 'gray', rect.center, 10)
 
 
             elif '_1' in self.type:
-                self.screen.fill(self.settings.team_color[self.settings.teams[0]], self.rect)
-                pygame.draw.circle(self.screen, self.settings.b_w_team_color[self.settings.teams[0]], self.rect.center, 10)
-                pygame.draw.circle(self.screen, self.settings.alt_team_color[self.settings.teams[0]], self.rect.center, 6)
+                surface.fill(self.settings.team_color[self.settings.teams[0]], rect)
+                pygame.draw.circle(surface, self.settings.b_w_team_color[self.settings.teams[0]], rect.center, 10)
+                pygame.draw.circle(surface, self.settings.alt_team_color[self.settings.teams[0]], rect.center, 6)
 
             elif '_2' in self.type:
-                self.screen.fill(self.settings.team_color[self.settings.teams[1]], self.rect)
-                pygame.draw.circle(self.screen, self.settings.b_w_team_color[self.settings.teams[1]], self.rect.center, 10)
-                pygame.draw.circle(self.screen, self.settings.alt_team_color[self.settings.teams[1]], self.rect.center, 6)
+                surface.fill(self.settings.team_color[self.settings.teams[1]], rect)
+                pygame.draw.circle(surface, self.settings.b_w_team_color[self.settings.teams[1]], rect.center, 10)
+                pygame.draw.circle(surface, self.settings.alt_team_color[self.settings.teams[1]], rect.center, 6)
 
 
 
 
 
 
-        self.screen.blit(self.image, self.rect)
+        surface.blit(self.image, rect)
 
         if self.type != 'wall':
-            self.screen.blit(self.grid_lines, self.rect)
+            surface.blit(self.grid_lines, rect)
         else:
             for c in CARDINALS:
                 if self.show_wallcaps[c]:
-                    self.screen.blit(self.wallcap_images[c], self.rect)
+                    surface.blit(self.wallcap_images[c], rect)
+
+
 
+    def draw_overlays(self, surface, rect):
+        """draw LOS marks and the range highlight over the terrain"""
         for i in range(self.marks):
-            self.screen.blit(self.mark_image, self.rect)
+            surface.blit(self.mark_image, rect)
 
         if self.hilited:
             color = self.hilited
-            self.screen.blit(self.hilited_image[color], self.rect)
\ No newline at end of file
+            surface.blit(self.hilited_image[color], rect)
\ No newline at end of file
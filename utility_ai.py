@@ -0,0 +1,189 @@
+# utility_ai.py
+
+"""a cheap computer player for big batches of self-play games: it scores
+the tiles a unit can walk to with per-map value maps worked out once, and
+takes the shot with the best chance of hitting
+
+utility_policy() has the same form as the policies in self_play.py (and is
+listed there as 'utility')"""
+
+from lf_functions import (CARDINALS, DIAGONAL_SIDES, tile_direction,
+    determine_range)
+from game_state import calc_to_hit
+from hit_odds import chance_to_roll
+
+
+# how much each thing is worth when picking a tile to walk to
+SHOT_WEIGHT     = 3.0   # per enemy the tile can see (up to MAX_TARGETS)
+MAX_TARGETS     = 2
+DANGER_WEIGHT   = 1.5   # per enemy that can see the tile without cover
+COVER_WEIGHT    = 0.5   # per side of the tile that's in cover
+EXPOSURE_WEIGHT = 1.0   # for the most exposed tile on the map
+ELEVATED_WEIGHT = 0.5
+BASE_WEIGHT     = 1.0   # per step to the nearest base, if out of laser
+
+# take any shot at least this likely to hit; on the unit's last AP (or
+#   once it can't move) any shot is worth taking
+FIRE_CHANCE = 0.4
+
+
+
+################################################################################
+# VALUE MAPS
+################################################################################
+
+class ValueMaps:
+    """what's known about every tile before any units are placed, indexed
+    like game_map.all_tiles
+
+    exposure   the fraction of the map's tiles that can see the tile
+    cover      the cardinal directions a unit on the tile is covered in
+    elevated   whether the tile is elevated
+    base_steps for each team, steps to the nearest of its bases (None if
+               there's no way there)"""
+
+    def __init__(self, game_map):
+        tiles = game_map.all_tiles
+        most_seen = max(bin(visible).count('1')
+                        for visible in game_map.los_visible) or 1
+        self.exposure = [bin(visible).count('1') / most_seen
+                         for visible in game_map.los_visible]
+        self.elevated = [tile.type == 'elevated' for tile in tiles]
+
+        # the same rules as UnitState.check_cover
+        self.cover = []
+        for tile in tiles:
+            adjoiners = game_map.adjoiner_tiles[tile.index]
+            if tile.type == 'elevated':
+                cover_types = ('wall',)
+            else:
+                cover_types = ('wall', 'elevated')
+            self.cover.append(frozenset(
+                direction for i, direction in enumerate(CARDINALS)
+                if adjoiners[i].type in cover_types))
+
+        self.base_steps = {team: _steps_from(game_map, bases)
+                           for team, bases in game_map.bases.items()}
+
+
+# ValueMaps by the terrain key load_los_table() gave the map, so a batch
+#   of games on one map only works them out once
+_value_maps = {}
+
+def value_maps(game_map):
+    """the map's ValueMaps, worked out the first time they're asked for"""
+    key = getattr(game_map, 'terrain_key', None)
+    if key is None:
+        return ValueMaps(game_map)
+    if key not in _value_maps:
+        _value_maps[key] = ValueMaps(game_map)
+    return _value_maps[key]
+
+
+def _steps_from(game_map, start_tiles):
+    """breadth-first steps from the nearest start tile to every tile, past
+    walls the way units walk (no cutting wall corners)"""
+    steps = [None] * len(game_map.all_tiles)
+    frontier = []
+    for tile in start_tiles:
+        steps[tile.index] = 0
+        frontier.append(tile.index)
+    while frontier:
+        next_frontier = []
+        for index in frontier:
+            adjoiners = game_map.adjoiner_tiles[index]
+            for direction, adj_index in enumerate(
+                    game_map.adjoiner_index[index]):
+                if adj_index < 0 or steps[adj_index] is not None:
+                    continue
+                if adjoiners[direction].type == 'wall':
+                    continue
+                if direction in DIAGONAL_SIDES:
+                    n_s, e_w = DIAGONAL_SIDES[direction]
+                    if (adjoiners[n_s].type == 'wall' or
+                        adjoiners[e_w].type == 'wall'):
+                        continue
+                steps[adj_index] = steps[index] + 1
+                next_frontier.append(adj_index)
+        frontier = next_frontier
+    return steps
+
+
+
+################################################################################
+# DECISIONS
+################################################################################
+
+def utility_policy(game, unit):
+    """one action for the unit: fire, move, or None to stay put"""
+    enemies = list(game.teams[game.inactive_team])
+
+    if unit.laser_charged:
+        target, chance = best_shot(game, unit, enemies)
+        if target and (chance >= FIRE_CHANCE or unit.current_ap == 1 or
+                       not unit.can_move):
+            return 'fire', target
+
+    if not unit.can_move:
+        return None
+    tile = best_destination(game, unit, enemies)
+    if tile is unit.tile:
+        return None
+    return 'move', tile
+
+
+def best_shot(game, unit, enemies):
+    """the visible enemy the unit is most likely to hit, and the chance"""
+    best, best_chance = None, 0.0
+    for enemy in enemies:
+        if enemy.tile not in unit.visible_tiles:
+            continue
+        total  = calc_to_hit(game.settings, unit, enemy)['total']
+        chance = float(chance_to_roll(total, game.settings.dice))
+        if chance > best_chance:
+            best, best_chance = enemy, chance
+    return best, best_chance
+
+
+def best_destination(game, unit, enemies):
+    """the best scoring tile in the unit's walking range (or its own)"""
+    # other units may have moved since the range was last worked out
+    determine_range(game.game_map, unit)
+    maps = value_maps(game.game_map)
+    los_visible = game.game_map.los_visible
+    enemy_tiles = [enemy.tile for enemy in enemies]
+    base_steps  = maps.base_steps.get(unit.team)
+    recharging  = unit.laser_uncharged and base_steps
+
+    best, best_score = unit.tile, None
+    for tile in unit.tile_distance:
+        if tile.occupied and tile.occupied is not unit:
+            continue
+        index = tile.index
+        visible = los_visible[index]
+        cover = maps.cover[index]
+
+        # enemies in view, and the ones among them this tile isn't
+        #   covered against
+        targets = 0
+        danger  = 0
+        for enemy_tile in enemy_tiles:
+            if not visible >> enemy_tile.index & 1:
+                continue
+            targets += 1
+            if not cover.intersection(tile_direction(tile, enemy_tile)):
+                danger += 1
+
+        score = (COVER_WEIGHT * len(cover) -
+                 DANGER_WEIGHT * danger -
+                 EXPOSURE_WEIGHT * maps.exposure[index])
+        if recharging:
+            steps = base_steps[index]
+            score -= BASE_WEIGHT * (len(los_visible) if steps is None else steps)
+        else:
+            score += SHOT_WEIGHT * min(targets, MAX_TARGETS)
+            if maps.elevated[index]:
+                score += ELEVATED_WEIGHT
+        if best_score is None or score > best_score:
+            best, best_score = tile, score
+    return best
@@ -1,5 +1,7 @@
 import pygame
 
+from assets import load_font
+
 class Victory:
     """methods for when one team wins the game"""
 
@@ -32,7 +34,7 @@ class Victory:
     def show_victory(self):
         """show a victory message"""
 
-        font = pygame.font.SysFont(self.settings.font, 50)
+        font = load_font(self.settings.font, 50)
 
         Cx = self.settings.map_width / 2
         Cy = self.settings.map_height / 2